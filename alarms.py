@@ -0,0 +1,133 @@
+#=============================================================
+#=============================================================
+#=============================================================
+# Alarm schedule.
+#
+# Times are handled as seconds since the start of the week,
+# Sunday 00:00, using the DS3231's day of the week. Whenever an
+# alarm setting changes, or an alarm goes off, the time of the
+# next alarm is worked out once, so that checking for it each
+# second is just comparing two numbers.
+#
+# There are two alarms, each with its own days of the week, and
+# the alarm can be snoozed.
+#=============================================================
+#=============================================================
+#=============================================================
+
+import settings
+
+DAY  = 24 * 60 * 60
+WEEK = 7 * DAY
+
+# The days each alarm can go off on, chosen by the "alarm_days" settings.
+# Bit n is day n of the week, 0 being Sunday
+DAY_MASKS = (0x7F, 0x3E, 0x41)
+DAY_NAMES = ("Every Day", "Mon to Fri", "Sat and Sun")
+
+# The DS3231's days of the week, 1 to 7, as set in the settings menu.
+# Kept to 3 letters, as only 5 characters fit across an LCD
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# The settings for each alarm: on/off, hour, minute and days
+ALARM_KEYS = (("alarm_on", "alarm_hour", "alarm_min", "alarm_days"),
+              ("alarm2_on", "alarm2_hour", "alarm2_min", "alarm2_days"))
+
+alarms = []          # (seconds since midnight, day mask) of each alarm that is on
+next_time = None     # when the next alarm or snooze is due, or None if there isn't one
+snooze_time = None   # when a snoozed alarm is due to sound again
+last_now = None      # the time at the last check, or None to work out next_time again
+
+
+# The time as seconds since the start of the week. day is the DS3231's day of
+# the week, where Sunday is 7, or 0 when first set
+def week_seconds(day, hour, min, sec):
+    return (day % 7) * DAY + hour * 3600 + min * 60 + sec
+
+
+# Reads the alarm settings. Called when any of them change
+def load(value=None):
+    global alarms, last_now
+    alarms = []
+    for on, hour, min, days in ALARM_KEYS:
+        if settings.get_setting(on):
+            alarms.append((settings.get_setting(hour) * 3600 + settings.get_setting(min) * 60,
+                           DAY_MASKS[settings.get_setting(days) % len(DAY_MASKS)]))
+    last_now = None
+
+
+# Works out next_time, the first alarm or snooze after now. It may be in next
+# week, in which case it is WEEK or more
+def schedule(now):
+    global next_time
+    next_time = snooze_time
+    today = now // DAY
+    for t, days in alarms:
+        for d in range(today, today + 8):
+            when = d * DAY + t
+            if (when > now) and ((days >> (d % 7)) & 1):
+                if (next_time is None) or (when < next_time):
+                    next_time = when
+                break
+
+
+# Called every second with the time from the DS3231. Returns True when the
+# alarm should sound
+def check(day, hour, min, sec):
+    global next_time, snooze_time, last_now
+    now = week_seconds(day, hour, min, sec)
+    
+    if last_now is None:
+        schedule(now)
+    elif now < last_now:
+        # A new week has started
+        if next_time is not None:
+            next_time = next_time - WEEK
+        if snooze_time is not None:
+            snooze_time = snooze_time - WEEK
+    last_now = now
+    
+    if (next_time is None) or (now < next_time):
+        return False
+    
+    snooze_time = None
+    schedule(now)
+    return True
+
+
+# Puts off the alarm that is sounding for SNOOZE_MINUTES
+def snooze():
+    global snooze_time
+    if last_now is not None:
+        snooze_time = last_now + settings.SNOOZE_MINUTES * 60
+        schedule(last_now)
+
+
+# Stops the alarm that is sounding, cancelling any snooze
+def stop():
+    global snooze_time
+    snooze_time = None
+    if last_now is not None:
+        schedule(last_now)
+
+
+# Work out the next alarm again at the next check, e.g. after the time is set
+def restart():
+    global last_now
+    last_now = None
+
+
+# The hour and minute of the next alarm, or None if there isn't one
+def next_alarm():
+    if next_time is None:
+        return None
+    t = next_time % DAY
+    return t // 3600, (t // 60) % 60
+
+
+# Set up the alarms from the settings, and follow changes to them
+def start():
+    load()
+    for keys in ALARM_KEYS:
+        for key in keys:
+            settings.on_change(key, load)
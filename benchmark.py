@@ -0,0 +1,377 @@
+#=============================================================
+#=============================================================
+#=============================================================
+# Benchmarks for the display, clock and LED code
+#
+# On the Pico: stop the clock, then run this file from Thonny.
+# On a PC:     python benchmark.py     (uses the emulator)
+#
+# For each benchmark it measures the time per call in
+# microseconds, the bytes sent over the SPI (or the PIO, with
+# LCD_BACKEND "pio"), I2C and NeoPixel buses per call, the
+# heap bytes allocated per call, and the RAM used by the digit
+# image caches afterwards.
+#
+# Each result is printed as one line of JSON, and all of them
+# are saved in benchmark.json. If benchmark.json is already
+# there, from a run of an earlier version, the change in each
+# figure is printed as well.
+#=============================================================
+#=============================================================
+#=============================================================
+
+import gc
+import json
+import os
+import sys
+import time
+
+try:
+    import machine
+except ImportError:
+    # Not on the Pico. Use the emulated board
+    import emulator
+    emulator.install()
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# main.py sets up the LCDs, the clock chip and the LEDs when imported,
+# but only starts the clock when it is run
+import main
+import display
+import leds
+import settings
+import transitions
+
+RESULTS_FILE = "benchmark.json"
+
+
+#=============================================================
+# Byte counters. The SPI, PIO and I2C objects are wrapped so
+# that every transfer is counted before being passed on. This
+# works the same on the Pico and on the emulator.
+#=============================================================
+class CountingSPI:
+
+    def __init__(self, spi):
+        self.spi = spi
+        self.count = 0
+
+    def write(self, buf):
+        self.count += len(buf)
+        self.spi.write(buf)
+
+
+# With LCD_BACKEND "pio" the LCD bytes go through the PIO state machine
+# instead, and are counted as SPI bytes too
+class CountingPio:
+
+    def __init__(self, pio):
+        self.pio = pio
+        self.count = 0
+
+    def send(self, address, dc, buf):
+        self.count += len(buf)
+        self.pio.send(address, dc, buf)
+
+    def release(self):
+        self.pio.release()
+
+
+# Only the data bytes are counted, not the address and register bytes
+class CountingI2C:
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.count = 0
+
+    def readfrom_mem(self, addr, reg, nbytes):
+        self.count += nbytes
+        return self.i2c.readfrom_mem(addr, reg, nbytes)
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        self.count += len(buf)
+        self.i2c.readfrom_mem_into(addr, reg, buf)
+
+    def writeto_mem(self, addr, reg, buf):
+        self.count += len(buf)
+        self.i2c.writeto_mem(addr, reg, buf)
+
+
+class CountingNeoPixel:
+
+    def __init__(self, strip):
+        self.strip_write = strip.write
+        self.length = len(strip.buf)
+        self.count = 0
+
+    def write(self):
+        self.count += self.length
+        self.strip_write()
+
+
+LCD = main.LCD
+RTC = main.RTC
+
+if LCD.pio is not None:
+    spi = CountingPio(LCD.pio)
+    LCD.pio = spi
+else:
+    spi = CountingSPI(LCD.spi)
+    LCD.spi = spi
+
+i2c = CountingI2C(RTC.i2c)
+RTC.i2c = i2c
+
+neopixel = CountingNeoPixel(leds.rgb_strip)
+leds.rgb_strip.write = neopixel.write
+
+
+#=============================================================
+# Heap measurement. MicroPython counts the bytes allocated
+# while the garbage collector is turned off. On the PC,
+# tracemalloc gives the peak extra memory used during the call
+#=============================================================
+if hasattr(gc, "mem_alloc"):
+
+    def allocated(fn, i):
+        gc.collect()
+        gc.disable()
+        try:
+            before = gc.mem_alloc()
+            fn(i)
+            return gc.mem_alloc() - before
+        finally:
+            gc.enable()
+
+else:
+    import tracemalloc
+
+    def allocated(fn, i):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            fn(i)
+            return tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+
+
+#=============================================================
+# Run fn(i) for i in range(calls), after `setup` and one
+# warm up call. Returns a dictionary of the results
+#=============================================================
+def run(name, fn, calls, setup=None):
+    if setup is not None:
+        setup()
+    fn(calls)
+
+    gc.collect()
+    spi.count = i2c.count = neopixel.count = 0
+    start = time.ticks_us()
+    for i in range(calls):
+        fn(i)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+
+    result = {
+        "name": name,
+        "calls": calls,
+        "us_per_call": elapsed // calls,
+        "spi_bytes": spi.count // calls,
+        "i2c_bytes": i2c.count // calls,
+        "led_bytes": neopixel.count // calls,
+        "alloc_bytes": allocated(fn, calls + 1),
+        "cache_bytes": LCD.cache_bytes(),
+    }
+    print(json.dumps(result))
+    return result
+
+
+#=============================================================
+# The benchmarks. Each is called with the loop count, so that
+# successive calls show different digits, patterns etc.
+#=============================================================
+def nixie_setup():
+    LCD.set_font(1)
+    LCD.select_digit(0)
+
+
+def dots_setup():
+    LCD.set_font(2)
+    LCD.select_digit(0)
+
+
+def seven_seg_setup():
+    LCD.set_font(6)
+    LCD.select_digit(0)
+
+
+def bench_display_digit(i):
+    LCD.display_digit(i % 10)
+
+
+def bench_display_text(i):
+    LCD.display_text("Alarm ON  {0}:{1:02d}".format(i % 24, i % 60))
+
+
+def colon_setup():
+    LCD.set_font(1)
+    LCD.clear()
+
+
+def bench_show_colon(i):
+    LCD.show_colon(2, i & 1)
+
+
+# One update of the six digit time display, as happens each second
+def time_setup():
+    LCD.set_font(1)
+    LCD.clear()
+    main.previous_digits = [None, None, None, None, None, None]
+
+
+def bench_show_time_6_digits(i):
+    sec = 10 + i
+    asyncio.run(main.show_time_6_digits(12, (sec // 60) % 60, sec % 60))
+
+
+# One digit changing with each transition effect, in the Nixie and 7 segment fonts.
+# The time per call includes the waits between frames
+def transition_setup(effect, font):
+    def setup():
+        settings.TRANSITION = effect
+        LCD.set_font(font)
+        LCD.select_digit(0)
+    return setup
+
+
+def bench_transition(i):
+    transitions.start_tick()
+    asyncio.run(transitions.change_digit(LCD, i % 10, (i + 1) % 10))
+
+
+# Loading .raw digit images from flash, into the frame buffer then sent to the
+# LCD, or sent straight to the LCD from the file
+RAW_FILES = tuple(str(d) + ".raw" for d in range(10))
+
+
+def bench_read_raw(i):
+    LCD.read_raw(RAW_FILES[i % 10])
+    LCD.show()
+
+
+def bench_stream_raw(i):
+    LCD.stream_raw(RAW_FILES[i % 10])
+
+
+def stream_setup():
+    LCD.select_digit(0)
+    if len(LCD.stream_buf) == 0:
+        LCD.stream_buf = memoryview(bytearray(display.STREAM_BLOCK_BYTES))
+
+
+def bench_read_time(i):
+    RTC.Read_Time()
+
+
+# Decimal to BCD and back for 0 to 99, with ds3231.py's lookup tables and with
+# the arithmetic they replaced
+def bench_bcd_tables(i):
+    for n in range(100):
+        RTC.BCD_Convert_DEC(RTC.DEC_Convert_BCD(n))
+
+
+def arithmetic_bcd_to_dec(code):
+    return (((code & 0xf000) >> 12)) * 1000 + (((code & 0xf00) >> 8)) * 100 + \
+           (((code & 0xf0) >> 4)) * 10 + (code & 0x0f)
+
+
+def arithmetic_dec_to_bcd(code):
+    return int(code % 10 + ((int(code / 10) % 10) << 4) + ((int(code / 100) % 10) << 8) +
+               ((int(code / 1000) % 10) << 12))
+
+
+def bench_bcd_arithmetic(i):
+    for n in range(100):
+        arithmetic_bcd_to_dec(arithmetic_dec_to_bcd(n))
+
+
+def bench_set_rgb_pattern(i):
+    leds.set_rgb_pattern(i % 11)
+
+
+BENCHMARKS = (
+    ("display_nixie", bench_display_digit, 20, nixie_setup),
+    ("display_dots", bench_display_digit, 10, dots_setup),
+    ("display_7seg", bench_display_digit, 20, seven_seg_setup),
+    ("display_text", bench_display_text, 10, seven_seg_setup),
+    ("show_colon", bench_show_colon, 20, colon_setup),
+    ("show_time_6_digits", bench_show_time_6_digits, 60, time_setup),
+    ("transition_slide", bench_transition, 10, transition_setup("slide", 1)),
+    ("transition_crossfade", bench_transition, 10, transition_setup("crossfade", 6)),
+    ("transition_flicker", bench_transition, 10, transition_setup("flicker", 6)),
+    ("read_raw", bench_read_raw, 10, nixie_setup),
+    ("stream_raw", bench_stream_raw, 10, stream_setup),
+    ("read_time", bench_read_time, 100, None),
+    ("bcd_tables", bench_bcd_tables, 20, None),
+    ("bcd_arithmetic", bench_bcd_arithmetic, 20, None),
+    ("set_rgb_pattern", bench_set_rgb_pattern, 100, None),
+)
+
+
+#=============================================================
+# Compare with the results of an earlier run
+#=============================================================
+def load_previous():
+    try:
+        with open(RESULTS_FILE) as f:
+            data = json.load(f)
+        if data["platform"] != sys.platform:
+            return {}
+        return {r["name"]: r for r in data["results"]}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def compare(previous, results):
+    print()
+    print("Change from the previous run:")
+    for r in results:
+        old = previous.get(r["name"])
+        if old is None:
+            continue
+        changes = []
+        for key in ("us_per_call", "spi_bytes", "i2c_bytes", "led_bytes", "alloc_bytes", "cache_bytes"):
+            if old.get(key, 0) != r[key]:
+                changes.append("{0} {1} -> {2}".format(key, old.get(key, 0), r[key]))
+        print("  {0}: {1}".format(r["name"], ", ".join(changes) if changes else "no change"))
+
+
+def benchmark():
+    previous = load_previous()
+    print("Running benchmarks on", sys.platform)
+
+    results = []
+    for name, fn, calls, setup in BENCHMARKS:
+        if (fn in (bench_read_raw, bench_stream_raw)) and ("0.raw" not in os.listdir()):
+            continue    # only the .rle digit images have been uploaded
+        results.append(run(name, fn, calls, setup))
+
+    print(transitions.stats())
+
+    settings.TRANSITION = "none"
+    LCD.clear()
+    leds.set_rgb_pattern(settings.get_setting("rgb_mode"))
+
+    with open(RESULTS_FILE, "w") as f:
+        json.dump({"platform": sys.platform, "results": results}, f)
+
+    if previous:
+        compare(previous, results)
+
+
+benchmark()
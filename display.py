@@ -27,11 +27,22 @@
 #===============================================
 
 
-from machine import Pin,SPI,PWM
+from machine import Pin,SPI,PWM,mem32
 import framebuf
 import time
+import os
 import settings
 
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+try:
+    import rp2
+except ImportError:
+    rp2 = None
+
 
 # ===========Start of FONTS Section=========================
 # Standard ASCII 5x8 font
@@ -171,6 +182,140 @@ FONT = bytes([
 ])
 
 
+# Segments lit for each digit on the 7 segment display, A to G from bit 6 to bit 0
+SEGMENTS = bytes([
+    0b1111110, # 0
+    0b0110000, # 1
+    0b1101101, # 2
+    0b1111001, # 3
+    0b0110011, # 4
+    0b1011011, # 5
+    0b0011111, # 6
+    0b1110000, # 7
+    0b1111111, # 8
+    0b1110011  # 9
+])
+
+
+
+# SPI1 registers and DMA request number, for sending by DMA
+SPI1_SSPDR = 0x40040008     # data register
+SPI1_SSPSR = 0x4004000C     # status register
+SPI_SSPSR_BSY = 0x10        # set while a byte is being sent
+DREQ_SPI1_TX = 18
+
+# Size of the blocks read from a .raw image file when sending it straight to an LCD
+STREAM_BLOCK_BYTES = 2048
+
+
+# ===========ST7789 Initialisation Sequence=========================
+# Each entry is a command byte, the number of parameter bytes that follow,
+# then the parameter bytes themselves
+ST7789_INIT = bytes([
+    0x36, 1, 0x70,                          # MADCTL: rotated, RGB order
+    0x3A, 1, 0x05,                          # COLMOD: 16 bit RGB565
+    0xB2, 5, 0x0C, 0x0C, 0x00, 0x33, 0x33,  # Porch control
+    0xB7, 1, 0x35,                          # Gate control
+    0xBB, 1, 0x19,                          # VCOM
+    0xC0, 1, 0x2C,                          # LCM control
+    0xC2, 1, 0x01,                          # VDV and VRH enable
+    0xC3, 1, 0x12,                          # VRH
+    0xC4, 1, 0x20,                          # VDV
+    0xC6, 1, 0x0F,                          # Frame rate
+    0xD0, 2, 0xA4, 0xA1,                    # Power control
+    0xE0, 14, 0xD0, 0x04, 0x0D, 0x11, 0x13, 0x2B, 0x3F,   # Positive gamma
+              0x54, 0x4C, 0x18, 0x0D, 0x0B, 0x1F, 0x23,
+    0xE1, 14, 0xD0, 0x04, 0x0C, 0x11, 0x13, 0x2C, 0x3F,   # Negative gamma
+              0x44, 0x51, 0x2F, 0x1F, 0x1F, 0x20, 0x23,
+    0x21, 0,                                # Display inversion on
+    0x11, 0,                                # Sleep out
+    0x29, 0                                 # Display on
+])
+
+
+
+
+#=================================================================
+#=================================================================
+#=================================================================
+# Glyph Cache. Keeps the most recently shown digit images in RAM,
+# so they don't have to be read from flash every time.
+#
+# Least recently used glyphs are thrown away to keep the total
+# size within the budget (in bytes). Glyphs are only kept if the
+# budget holds at least two of them, as a cache of one glyph just
+# costs a copy of each. A budget of 0 disables the cache.
+#=================================================================
+#=================================================================
+#=================================================================
+class GlyphCache:
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.glyphs = {}
+        self.lru = []      # keys, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+
+    # Returns the cached glyph for key, or None if it is not in the cache
+    def get(self, key):
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            self.misses = self.misses + 1
+            return None
+        
+        self.hits = self.hits + 1
+        if self.lru[-1] != key:
+            self.lru.remove(key)
+            self.lru.append(key)
+        return glyph
+
+
+    # Stores a copy of data in the cache, evicting the least recently used
+    # glyphs to make room. An evicted glyph's buffer is reused if it is the
+    # same size, to save allocating a new one.
+    # If owned is True, data is stored as it is rather than copied.
+    def put(self, key, data, owned=False):
+        size = len(data)
+        if (2 * size > self.budget) or (key in self.glyphs):
+            return
+        
+        spare = None
+        while self.used + size > self.budget:
+            old = self.glyphs.pop(self.lru.pop(0))
+            self.used = self.used - len(old)
+            if len(old) == size:
+                spare = old
+        
+        try:
+            if owned:
+                spare = data
+            else:
+                if spare is None:
+                    spare = bytearray(size)
+                spare[:] = data
+        except MemoryError:
+            return
+        
+        self.glyphs[key] = spare
+        self.lru.append(key)
+        self.used = self.used + size
+
+
+    # Empties the cache
+    def clear(self):
+        self.glyphs = {}
+        self.lru = []
+        self.used = 0
+
+
+    def __str__(self):
+        return "Glyph cache: {0} hits, {1} misses, {2} glyphs, {3}/{4} bytes".format(
+            self.hits, self.misses, len(self.glyphs), self.used, self.budget)
+
+
 
 
 #=================================================================
@@ -236,29 +381,95 @@ class Display(framebuf.FrameBuffer):
         self.cs3 = Pin(settings.CS3_PIN,Pin.OUT)
         self.rst = Pin(settings.RST_PIN,Pin.OUT)        
         self.bl  = Pin(settings.BL_PIN)        
+        self.cs_h()
+        
+        # Preallocated buffers for command bytes and their parameters
+        self.cmd_buf = bytearray(1)
+        self.data_buf = bytearray(1)
+        self.window_buf = bytearray(4)
         
         # set the LCD backlight level
         self.pwm = PWM(self.bl)
         self.pwm.freq(1000)
         self.set_brightness(10)
         
-        # Use Hardware SPI for speed. 
-        self.spi = SPI(1,
-                       25_000_000,
-                       polarity=0,
-                       phase=0,
-                       sck=Pin(settings.CLK_PIN),
-                       mosi=Pin(settings.DIN_PIN),
-                       miso=None)
-        
-         # this has to be after setting up SPI as the LCDs DC pin has been wired to the SPI1 miso input
-        self.dc = Pin(settings.DC_PIN,Pin.OUT)
-        self.dc.value(1)
+        # Drive the LCDs with a PIO state machine, if chosen in settings.py
+        self.pio = None
+        if settings.LCD_BACKEND == "pio":
+            import lcd_pio
+            self.pio = lcd_pio.PioLcd(settings.LCD_PIO_FREQ)
+            self.spi = None
+            self.dc = None
+        else:
+            # Use Hardware SPI for speed. 
+            self.spi = SPI(1,
+                           25_000_000,
+                           polarity=0,
+                           phase=0,
+                           sck=Pin(settings.CLK_PIN),
+                           mosi=Pin(settings.DIN_PIN),
+                           miso=None)
+            
+             # this has to be after setting up SPI as the LCDs DC pin has been wired to the SPI1 miso input
+            self.dc = Pin(settings.DC_PIN,Pin.OUT)
+            self.dc.value(1)
         
         # Set up the frame buffer
         self.buffer = bytearray(self.height * self.width * 2)
+        self.buffer_mv = memoryview(self.buffer)
+        self.stride = self.width * 2
         super().__init__(self.buffer, self.width, self.height, framebuf.RGB565)
         
+        # Optionally send the pictures by DMA, from a second buffer if double buffered
+        self.dma = None
+        self.sending = False
+        self.sent_flag = asyncio.ThreadSafeFlag()
+        self.tx_buffer_mv = None
+        if settings.SPI_DMA and (self.pio is None) and (rp2 is not None) and hasattr(rp2, "DMA"):
+            self.dma = rp2.DMA()
+            self.dma_ctrl = self.dma.pack_ctrl(size=0, inc_write=False,
+                                               treq_sel=DREQ_SPI1_TX, irq_quiet=False)
+            self.dma.irq(handler=self.dma_done)
+            if settings.SPI_DOUBLE_BUFFER:
+                self.tx_buffer_mv = memoryview(bytearray(len(self.buffer)))
+        
+        # Recently used Nixie digit images are kept in RAM
+        self.glyph_cache = GlyphCache(settings.GLYPH_CACHE_BYTES)
+        
+        # The Dots and 7 segment digits are drawn once, then kept in RAM as 1-bit
+        # images. Emptied by set_font() when the font style changes
+        self.digit_cache = GlyphCache(settings.DIGIT_CACHE_BYTES)
+        self.font_style = None
+        
+        # The rectangle x, y, w, h holding the lit pixels of each of those digits,
+        # found when the digit is first drawn. Emptied along with the digit cache
+        self.digit_bounds = {}
+        
+        # Text characters, magnified and rotated ready to blit, made as they are first used.
+        # The palette maps their 1-bit pixels, and those of the Dots and 7 segment digits,
+        # to black and a colour
+        self.text_glyphs = {}
+        self.palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+        
+        # Use the compressed .rle digit images if they have been uploaded
+        self.nixie_compressed = "0.rle" in os.listdir()
+        
+        # Optionally send .raw digit images straight from their files to the LCDs,
+        # a block at a time through stream_buf
+        self.nixie_stream = settings.NIXIE_STREAM and not self.nixie_compressed
+        self.stream_buf = memoryview(bytearray(STREAM_BLOCK_BYTES if self.nixie_stream else 0))
+        
+        # The dirty rectangle is the area of the frame buffer drawn into since the
+        # last show(). Only that area is sent to the LCD. Empty when x0 > x1.
+        self.clear_dirty()
+        
+        # Describes the picture in the frame buffer, e.g. which digit in which font,
+        # or None if unknown. panel_content holds the same for what each LCD shows,
+        # indexed by chip select address, so show() can skip sending a picture that
+        # the LCD already has
+        self.content = None
+        self.panel_content = [None, None, None, None, None, None]
+        
         # Wiggle the LCD reset line
         self.reset_all()
         
@@ -267,7 +478,9 @@ class Display(framebuf.FrameBuffer):
             self.select_digit(digit)
             self.init()
             
-        self.set_font(settings.get_setting("font"))
+        self.set_font(settings.current.font)
+        settings.on_change("font", self.set_font)
+        settings.on_change("brightness", self.set_brightness)
         
         self.clear()
         
@@ -302,21 +515,46 @@ class Display(framebuf.FrameBuffer):
         self.cs3.value(1)
 
 
-    #  Write a single command byte to the current LCD
-    def write_cmd(self, cmd):
-        self.cs_h()
+    # Write a command byte, followed by its parameter bytes if any, to the
+    # current LCD in a single chip select. CS is always left released.
+    def write_cmd_params(self, cmd, params=None):
+        self.wait_sent()
+        self.cmd_buf[0] = cmd
+        
+        if self.pio is not None:
+            self.pio.send(self.selected_digit, 0, self.cmd_buf)
+            if params:
+                self.pio.send(self.selected_digit, 1, params)
+            self.pio.release()
+            return
+            
         self.dc(0)
         self.cs_l()
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(self.cmd_buf)
+        if params:
+            self.dc(1)
+            self.spi.write(params)
         self.cs_h()
 
 
+    #  Write a single command byte to the current LCD
+    def write_cmd(self, cmd):
+        self.write_cmd_params(cmd)
+
+
     #  Write a single data byte to the current LCD
     def write_data(self, buf):
-        self.cs_h()
+        self.wait_sent()
+        self.data_buf[0] = buf
+        
+        if self.pio is not None:
+            self.pio.send(self.selected_digit, 1, self.data_buf)
+            self.pio.release()
+            return
+            
         self.dc(1)
         self.cs_l()
-        self.spi.write(bytearray([buf]))
+        self.spi.write(self.data_buf)
         self.cs_h()
 
     # Wiggle the LCD reset pins
@@ -329,150 +567,376 @@ class Display(framebuf.FrameBuffer):
         time.sleep(0.01)
 
 
-    # Initialise the currently selected LCD
+    # Initialise the currently selected LCD from the ST7789_INIT table.
+    # The whole table is sent in one chip select, only DC changing between
+    # each command and its parameters
     def init(self):
-        self.write_cmd(0x36)
-        self.write_data(0x70)
-
-        self.write_cmd(0x3A) 
-        self.write_data(0x05)
-
-        self.write_cmd(0xB2)
-        self.write_data(0x0C)
-        self.write_data(0x0C)
-        self.write_data(0x00)
-        self.write_data(0x33)
-        self.write_data(0x33)
-
-        self.write_cmd(0xB7)
-        self.write_data(0x35) 
-
-        self.write_cmd(0xBB)
-        self.write_data(0x19)
-
-        self.write_cmd(0xC0)
-        self.write_data(0x2C)
-
-        self.write_cmd(0xC2)
-        self.write_data(0x01)
-
-        self.write_cmd(0xC3)
-        self.write_data(0x12)   
-
-        self.write_cmd(0xC4)
-        self.write_data(0x20)
-
-        self.write_cmd(0xC6)
-        self.write_data(0x0F) 
-
-        self.write_cmd(0xD0)
-        self.write_data(0xA4)
-        self.write_data(0xA1)
-
-        self.write_cmd(0xE0)
-        self.write_data(0xD0)
-        self.write_data(0x04)
-        self.write_data(0x0D)
-        self.write_data(0x11)
-        self.write_data(0x13)
-        self.write_data(0x2B)
-        self.write_data(0x3F)
-        self.write_data(0x54)
-        self.write_data(0x4C)
-        self.write_data(0x18)
-        self.write_data(0x0D)
-        self.write_data(0x0B)
-        self.write_data(0x1F)
-        self.write_data(0x23)
-
-        self.write_cmd(0xE1)
-        self.write_data(0xD0)
-        self.write_data(0x04)
-        self.write_data(0x0C)
-        self.write_data(0x11)
-        self.write_data(0x13)
-        self.write_data(0x2C)
-        self.write_data(0x3F)
-        self.write_data(0x44)
-        self.write_data(0x51)
-        self.write_data(0x2F)
-        self.write_data(0x1F)
-        self.write_data(0x1F)
-        self.write_data(0x20)
-        self.write_data(0x23)
-        
-        self.write_cmd(0x21)
-        self.write_cmd(0x11)
-        self.write_cmd(0x29)
-
-
-    # Sends the entire frame buffer to the currently selected LCD
+        self.wait_sent()
+        self.panel_content[self.selected_digit] = None
+        table = memoryview(ST7789_INIT)
+        pio = self.pio
+        address = self.selected_digit
+        if pio is None:
+            self.cs_l()
+        i = 0
+        while i < len(table):
+            count = table[i + 1]
+            self.cmd_buf[0] = table[i]
+            if pio is not None:
+                pio.send(address, 0, self.cmd_buf)
+                if count:
+                    pio.send(address, 1, table[i + 2:i + 2 + count])
+            else:
+                self.dc(0)
+                self.spi.write(self.cmd_buf)
+                if count:
+                    self.dc(1)
+                    self.spi.write(table[i + 2:i + 2 + count])
+            i = i + 2 + count
+        if pio is not None:
+            pio.release()
+        else:
+            self.cs_h()
+
+
+    # Mark the whole frame buffer as changed, so the next show() sends all of it.
+    # Call this after writing to self.buffer directly.
+    def invalidate(self):
+        self.content = None
+        self.dirty_x0 = 0
+        self.dirty_y0 = 0
+        self.dirty_x1 = self.width - 1
+        self.dirty_y1 = self.height - 1
+
+
+    # Forget any changes. The next show() will send nothing.
+    def clear_dirty(self):
+        self.dirty_x0 = self.width
+        self.dirty_y0 = self.height
+        self.dirty_x1 = -1
+        self.dirty_y1 = -1
+
+
+    # Extend the dirty rectangle to include the area w x h pixels at x,y
+    def mark_dirty(self, x, y, w, h):
+        self.content = None
+        x1 = x + w - 1
+        y1 = y + h - 1
+        
+        if x < 0:
+            x = 0
+        if y < 0:
+            y = 0
+        if x1 >= self.width:
+            x1 = self.width - 1
+        if y1 >= self.height:
+            y1 = self.height - 1
+        if (x > x1) or (y > y1):
+            return
+            
+        if x < self.dirty_x0:
+            self.dirty_x0 = x
+        if y < self.dirty_y0:
+            self.dirty_y0 = y
+        if x1 > self.dirty_x1:
+            self.dirty_x1 = x1
+        if y1 > self.dirty_y1:
+            self.dirty_y1 = y1
+
+
+    # FrameBuffer drawing methods, wrapped to keep track of the dirty rectangle
+    def fill(self, c):
+        super().fill(c)
+        self.invalidate()
+        self.content = ("fill", c)
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, c)
+        self.mark_dirty(x, y, 1, 1)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.mark_dirty(x, y, w, 1)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.mark_dirty(x, y, 1, h)
+
+    def line(self, x1, y1, x2, y2, c):
+        super().line(x1, y1, x2, y2, c)
+        self.mark_dirty(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+
+    def rect(self, x, y, w, h, c, f=False):
+        super().rect(x, y, w, h, c, f)
+        self.mark_dirty(x, y, w, h)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.mark_dirty(x, y, w, h)
+
+    def ellipse(self, x, y, xr, yr, c, f=False, m=15):
+        super().ellipse(x, y, xr, yr, c, f, m)
+        self.mark_dirty(x - xr, y - yr, 2 * xr + 1, 2 * yr + 1)
+
+    def text(self, s, x, y, c=1):
+        super().text(s, x, y, c)
+        self.mark_dirty(x, y, 8 * len(s), 8)
+
+    # The size of a blitted FrameBuffer is unknown here, so assume it covers everything.
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        super().blit(fbuf, x, y, key, palette)
+        self.invalidate()
+
+    def scroll(self, xstep, ystep):
+        super().scroll(xstep, ystep)
+        self.invalidate()
+
+    def poly(self, x, y, coords, c, f=False):
+        super().poly(x, y, coords, c, f)
+        self.invalidate()
+
+
+    # Set the LCD's column and row address window to the frame buffer
+    # rectangle x0,y0 to x1,y1 inclusive. The panel's visible area starts
+    # at column 40 (0x28), row 53 (0x35)
+    def set_window(self, x0, y0, x1, y1):
+        buf = self.window_buf
+        
+        x0 = x0 + 0x28
+        x1 = x1 + 0x28
+        buf[0] = x0 >> 8
+        buf[1] = x0 & 0xFF
+        buf[2] = x1 >> 8
+        buf[3] = x1 & 0xFF
+        self.write_cmd_params(0x2A, buf)
+        
+        y0 = y0 + 0x35
+        y1 = y1 + 0x35
+        buf[0] = y0 >> 8
+        buf[1] = y0 & 0xFF
+        buf[2] = y1 >> 8
+        buf[3] = y1 & 0xFF
+        self.write_cmd_params(0x2B, buf)
+
+
+    # Sends the dirty rectangle of the frame buffer to the currently selected LCD.
+    # Whole rows are sent in a single transfer. Narrower rectangles are sent one
+    # row at a time, all within the one RAMWR, from memoryview slices of the buffer
+    #
+    # When sending by DMA, whole rows are sent in the background. Unless double
+    # buffered, show() waits for them to be sent, as the frame buffer mustn't be
+    # changed until then. show_async() lets other tasks run while waiting.
     def show(self):
-        self.write_cmd(0x2A)
-        self.write_data(0x00)
-        self.write_data(0x28)
-        self.write_data(0x01)
-        self.write_data(0x17)
+        if self.start_show() and (self.tx_buffer_mv is None):
+            self.wait_sent()
+            
+            
+    async def show_async(self):
+        await self.wait_sent_async()
+        if self.start_show() and (self.tx_buffer_mv is None):
+            await self.wait_sent_async()
+            
+            
+    # Starts sending the dirty rectangle. Returns True if it is being sent by DMA,
+    # in which case the chip select is held until wait_sent() is called
+    def start_show(self):
+        self.wait_sent()
         
-        self.write_cmd(0x2B)
-        self.write_data(0x00)
-        self.write_data(0x35)
-        self.write_data(0x00)
-        self.write_data(0xBB)
+        x0 = self.dirty_x0
+        y0 = self.dirty_y0
+        x1 = self.dirty_x1
+        y1 = self.dirty_y1
         
-        self.write_cmd(0x2C)
+        if (x0 > x1) or (y0 > y1):
+            return False    # nothing has changed since the last show()
         
-        self.cs_h()
-        self.dc(1)
-        self.cs_l()
-        self.spi.write(self.buffer)
-        self.cs_h()
+        # Nothing to send if the LCD already shows this picture
+        content = self.content
+        if (content is not None) and (self.panel_content[self.selected_digit] == content):
+            self.clear_dirty()
+            return False
+        
+        self.set_window(x0, y0, x1, y1)
+        
+        # RAMWR command then the pixel data, all in the one chip select
+        self.cmd_buf[0] = 0x2C
+        stride = self.stride
+        
+        if self.pio is not None:
+            self.pio_write_ram(x0, y0, x1, y1)
+        else:
+            self.dc(0)
+            self.cs_l()
+            self.spi.write(self.cmd_buf)
+            self.dc(1)
+            
+            if (x0 == 0) and (x1 == self.width - 1):
+                data = self.buffer_mv[y0 * stride:(y1 + 1) * stride]
+                if self.dma is None:
+                    self.spi.write(data)
+                else:
+                    if self.tx_buffer_mv is not None:
+                        self.tx_buffer_mv[y0 * stride:(y1 + 1) * stride] = data
+                        data = self.tx_buffer_mv[y0 * stride:(y1 + 1) * stride]
+                    self.sent_flag.clear()
+                    self.sending = True
+                    self.dma.config(read=data, write=SPI1_SSPDR, count=len(data),
+                                    ctrl=self.dma_ctrl, trigger=True)
+            else:
+                start = y0 * stride + x0 * 2
+                length = (x1 - x0 + 1) * 2
+                for y in range(y0, y1 + 1):
+                    self.spi.write(self.buffer_mv[start:start + length])
+                    start = start + stride
+                    
+            if not self.sending:
+                self.cs_h()
+        self.clear_dirty()
+        
+        # The LCD only shows the described picture if all of it was sent
+        if (x0 > 0) or (y0 > 0) or (x1 < self.width - 1) or (y1 < self.height - 1):
+            content = None
+        self.panel_content[self.selected_digit] = content
+        
+        return self.sending
+    
+    
+    # Sends the RAMWR command in cmd_buf, then the rectangle x0,y0 to x1,y1 of the
+    # frame buffer, through the PIO state machine
+    def pio_write_ram(self, x0, y0, x1, y1):
+        pio = self.pio
+        address = self.selected_digit
+        stride = self.stride
+        
+        pio.send(address, 0, self.cmd_buf)
+        if (x0 == 0) and (x1 == self.width - 1):
+            pio.send(address, 1, self.buffer_mv[y0 * stride:(y1 + 1) * stride])
+        else:
+            start = y0 * stride + x0 * 2
+            length = (x1 - x0 + 1) * 2
+            for y in range(y0, y1 + 1):
+                pio.send(address, 1, self.buffer_mv[start:start + length])
+                start = start + stride
+        pio.release()
+        
+        
+    # Sends columns src_x to src_x+w-1 of the frame buffer to columns x to x+w-1
+    # of the selected LCD, one row at a time, e.g. to slide a picture onto it.
+    # The LCD is left showing a picture which the frame buffer doesn't describe
+    def show_columns(self, x, src_x, w):
+        self.wait_sent()
+        self.set_window(x, 0, x + w - 1, self.height - 1)
+        self.cmd_buf[0] = 0x2C
+        pio = self.pio
+        address = self.selected_digit
+        start = src_x * 2
+        length = w * 2
+        
+        if pio is not None:
+            pio.send(address, 0, self.cmd_buf)
+        else:
+            self.dc(0)
+            self.cs_l()
+            self.spi.write(self.cmd_buf)
+            self.dc(1)
+            
+        for y in range(self.height):
+            if pio is not None:
+                pio.send(address, 1, self.buffer_mv[start:start + length])
+            else:
+                self.spi.write(self.buffer_mv[start:start + length])
+            start = start + self.stride
+            
+        if pio is not None:
+            pio.release()
+        else:
+            self.cs_h()
+        self.panel_content[address] = None
+        
+        
+    # True while a picture is being sent by DMA
+    def busy(self):
+        return self.sending and self.dma.active()
+        
+        
+    # Waits for a picture being sent by DMA to finish, then releases the chip select.
+    # The DMA finishes when the last byte is queued, so also wait until it has been sent
+    def wait_sent(self):
+        if self.sending:
+            while self.dma.active():
+                pass
+            while mem32[SPI1_SSPSR] & SPI_SSPSR_BSY:
+                pass
+            self.cs_h()
+            self.sending = False
+            
+            
+    # As wait_sent(), but lets other tasks run until the DMA has finished
+    async def wait_sent_async(self):
+        if self.sending:
+            while self.dma.active():
+                await self.sent_flag.wait()
+            self.wait_sent()
+            
+            
+    # DMA interrupt handler, called when the DMA has finished
+    def dma_done(self, dma):
+        self.sent_flag.set()
         
 
+    # Sends the changed area of the frame buffer to several LCDs, for when they
+    # all show the same thing, so that it only has to be drawn once.
+    # The chip select lines are decoded to select just one LCD at a time, so the
+    # LCDs can't all be written at once. They are written one after the other.
+    def show_all(self, digits=(0,1,2,3,4,5)):
+        x0 = self.dirty_x0
+        y0 = self.dirty_y0
+        x1 = self.dirty_x1
+        y1 = self.dirty_y1
+        
+        for digit in digits:
+            self.select_digit(digit)
+            self.dirty_x0 = x0
+            self.dirty_y0 = y0
+            self.dirty_x1 = x1
+            self.dirty_y1 = y1
+            self.show()
+            
+
     # Clears all digits to black
     def clear (self):
-        for d in range(0,6):
-            self.select_digit(d)
-            self.fill(self.black)
-            self.show()
+        self.fill(self.black)
+        self.show_all()
 
 
     # Displays a single character.
     # The coordinates are for the bottom left of the character
     def print_char(self, letter, left, top, col):
-        code = ord(letter) * 5    # 5 bytes per character
-        for ii in range(5):
-            line = FONT[code + 4 - ii]
-            for yy in range(8):
-                if (line >> yy) & 0x1:
-                    
-                    # Draw the character 4x oversized
-                    x0 = ii*4+109-left
-                    x1 = x0+1
-                    x2 = x1+1
-                    x3 = x2+1
-                    
-                    y0 = yy*4+205-top
-                    y1 = y0+1
-                    y2 = y1+1
-                    y3 = y2+1
-                    
-                    self.pixel(y0,x0,col) 
-                    self.pixel(y1,x0,col) 
-                    self.pixel(y2,x0,col) 
-                    self.pixel(y3,x0,col) 
-                    self.pixel(y0,x1,col) 
-                    self.pixel(y1,x1,col) 
-                    self.pixel(y2,x1,col) 
-                    self.pixel(y3,x1,col) 
-                    self.pixel(y0,x2,col) 
-                    self.pixel(y1,x2,col) 
-                    self.pixel(y2,x2,col) 
-                    self.pixel(y3,x2,col) 
-                    self.pixel(y0,x3,col) 
-                    self.pixel(y1,x3,col) 
-                    self.pixel(y2,x3,col) 
-                    self.pixel(y3,x3,col) 
+        self.palette.pixel(1, 0, col)
+        self.blit(self.text_glyph(letter), 205-top, 109-left, self.black, self.palette)
+
+
+    # Returns the character as a 1-bit frame buffer, 4x oversized and rotated to suit
+    # the LCD, making it the first time the character is used. Each column of the
+    # 5x8 font becomes 4 rows of the glyph, each bit 4 pixels along the row.
+    def text_glyph(self, letter):
+        glyph = self.text_glyphs.get(letter)
+        if glyph is None:
+            rows = bytearray(FONT_WIDTH * 4 * 4)    # 20 rows of 32 pixels
+            code = ord(letter) * 5    # 5 bytes per character
+            for ii in range(FONT_WIDTH):
+                line = FONT[code + 4 - ii]
+                for i in range(4):
+                    b = (0xF0 if line & 1 else 0) | (0x0F if line & 2 else 0)
+                    rows[ii*16 + i] = b
+                    line = line >> 2
+                for row in range(1, 4):
+                    rows[ii*16 + row*4:ii*16 + row*4 + 4] = rows[ii*16:ii*16 + 4]
+            glyph = framebuf.FrameBuffer(rows, FONT_HEIGHT * 4, FONT_WIDTH * 4, framebuf.MONO_HLSB)
+            self.text_glyphs[letter] = glyph
+        return glyph
 
 
     # Displays up to six short words of text on the current LCD, centred X and Y
@@ -494,100 +958,289 @@ class Display(framebuf.FrameBuffer):
                 
             top = top - 40        
         
+        self.content = ("text", self.fg_colour, line)
         self.show()
 
 
     # Loads a number image file onto the selected LCD,
-    # i.e. display_digit(0) displays file "0.raw"
+    # i.e. display_digit(0) displays file "0.raw" or "0.rle"
     #
-    # This is based on a binary image file (RGB565) with the same dimensions as the screen
-    # updates the global display_buffer directly, reading the file in 1KB chunks for speed
-    # The .raw image files must be preprocessed before uploading to the Pico.
+    # This is based on a binary image file (RGB565) with the same dimensions as the screen.
+    # The image is copied from the glyph cache if it is there, otherwise it is read
+    # from the file and then cached. Uncompressed .raw files are read straight into
+    # the frame buffer with readinto(). Compressed .rle files are cached compressed
+    # and expanded into the frame buffer by decode_rle().
+    # The image files must be preprocessed before uploading to the Pico.
     #
     # see https://www.penguintutor.com/programming/picodisplayanimations
     # for a python program to generate the files in the correct format.
     def display_nixie (self, num):
         
-        if num is not None:
-            position = 0
-            blocksize = 1024
-
-            filename = str(int(num)) + ".raw"
-            with open (filename, "rb") as file:
-                chunk = file.read(blocksize)        
-                while chunk:
-                    self.buffer[position:position+len(chunk)] = chunk
-                    position = position + len(chunk)
-                    chunk = file.read(blocksize)
-        else:
+        if (num is not None) and self.nixie_stream:
+            num = int(num)
+            if self.panel_content[self.selected_digit] != ("Nixie", num):
+                self.stream_raw(str(num) + ".raw")
+                self.panel_content[self.selected_digit] = ("Nixie", num)
+            return
+            
+        self.draw_nixie(num)
+        self.show()
+        
+        
+    # Draws a Nixie digit image into the frame buffer, or clears it if num is None
+    def draw_nixie(self, num):
+        
+        if num is None:
             print("Clearing digit ", self.selected_digit)
             self.fill(self.black)
+            return
+            
+        num = int(num)
+        if self.nixie_compressed:
+            glyph = self.glyph_cache.get(num)
+            
+            if glyph is None:
+                filename = str(num) + ".rle"
+                with open (filename, "rb") as file:
+                    glyph = file.read()
+                self.glyph_cache.put(num, glyph, True)
+                
+            self.decode_rle(glyph)
+            
+        else:
+            glyph = self.glyph_cache.get(num)
+            
+            if glyph is not None:
+                self.buffer[:] = glyph
+                self.invalidate()
+            else:
+                self.read_raw(str(num) + ".raw")
+                self.glyph_cache.put(num, self.buffer)
+            
+        self.content = ("Nixie", num)
         
-        self.show()
+
+    # Reads a .raw image file into the frame buffer. readinto() reads it straight
+    # into the buffer, so no memory is allocated for it. A file may return fewer
+    # bytes than asked for, so the rest is read into the remainder of the buffer
+    def read_raw(self, filename):
+        with open (filename, "rb") as file:
+            pos = file.readinto(self.buffer_mv)
+            while pos < len(self.buffer):
+                n = file.readinto(self.buffer_mv[pos:])
+                if not n:
+                    break
+                pos = pos + n
+        self.invalidate()
+        
+        
+    # Sends a .raw image file straight to the selected LCD, without using the
+    # frame buffer, which is left as it was. The file is read a block at a time
+    # into stream_buf, and each block is sent before the next is read
+    def stream_raw(self, filename):
+        self.wait_sent()
+        self.set_window(0, 0, self.width - 1, self.height - 1)
+        self.cmd_buf[0] = 0x2C
+        block = self.stream_buf
+        pio = self.pio
+        address = self.selected_digit
+        
+        with open (filename, "rb") as file:
+            if pio is not None:
+                pio.send(address, 0, self.cmd_buf)
+            else:
+                self.dc(0)
+                self.cs_l()
+                self.spi.write(self.cmd_buf)
+                self.dc(1)
+                
+            n = file.readinto(block)
+            while n:
+                data = block if n == len(block) else block[:n]
+                if pio is not None:
+                    pio.send(address, 1, data)
+                else:
+                    self.spi.write(data)
+                n = file.readinto(block)
+                
+        if pio is not None:
+            pio.release()
+        else:
+            self.cs_h()
+        
+        
+    # Expands a compressed .rle image into the frame buffer.
+    #
+    # The format is the 4 characters "R565", the width and height as 16 bit
+    # big-endian numbers, then a series of packets, each starting with a control byte n:
+    #   n < 128  : n+1 literal RGB565 pixels follow (2 bytes each)
+    #   n >= 128 : the single RGB565 pixel that follows is repeated n-126 times
+    def decode_rle(self, data):
+        src = memoryview(data)
+        dst = self.buffer_mv
+        
+        if (bytes(src[0:4]) != b"R565") or \
+           ((src[4] << 8 | src[5]) != self.width) or \
+           ((src[6] << 8 | src[7]) != self.height):
+            raise Exception("Not a {0}x{1} RLE image".format(self.width, self.height))
+        
+        i = 8
+        end = len(src)
+        pos = 0
+        while i < end:
+            n = src[i]
+            if n < 128:
+                count = (n + 1) * 2
+                dst[pos:pos+count] = src[i+1:i+1+count]
+                i = i + 1 + count
+            else:
+                # Copy the pixel, then keep doubling up the copied part
+                count = (n - 126) * 2
+                dst[pos] = src[i+1]
+                dst[pos+1] = src[i+2]
+                done = 2
+                while done < count:
+                    k = min(done, count - done)
+                    dst[pos+done:pos+done+k] = dst[pos:pos+k]
+                    done = done + k
+                i = i + 3
+            pos = pos + count
+            
+        self.invalidate()
         
 
+    # Displays a Dots or 7 segment digit. The digit is drawn once by draw(), as a
+    # 1-bit image kept in the digit cache, then shown with a single blit which
+    # colours it using the palette
+    def display_generated(self, digit, draw):
+        self.draw_generated(digit, draw, self.fg_colour)
+        self.show()
+        
+        
+    # Draws a Dots or 7 segment digit into the frame buffer in the given colour.
+    # With key set to black, the unlit pixels are left as they were, so that
+    # two digits can be drawn over each other, and only the digit's lit
+    # rectangle is marked dirty
+    def draw_generated(self, digit, draw, colour, key=-1):
+        digit = int(digit)
+        glyph = self.generated_glyph(digit, draw)
+            
+        self.palette.pixel(1, 0, colour)
+        fb = framebuf.FrameBuffer(glyph, self.width, self.height, framebuf.MONO_HLSB)
+        
+        if key == -1:
+            self.blit(fb, 0, 0, key, self.palette)
+            self.content = (self.font_style, colour, digit)
+        else:
+            super().blit(fb, 0, 0, key, self.palette)
+            x, y, w, h = self.digit_bounds[digit]
+            self.mark_dirty(x, y, w, h)
+    
+    
+    # Returns the 1-bit image of a Dots or 7 segment digit, drawing it with draw()
+    # if it isn't in the digit cache
+    def generated_glyph(self, digit, draw):
+        glyph = self.digit_cache.get(digit)
+        
+        if glyph is None:
+            glyph = bytearray(self.width * self.height // 8)
+            draw(framebuf.FrameBuffer(glyph, self.width, self.height, framebuf.MONO_HLSB), digit)
+            self.digit_cache.put(digit, glyph, True)
+            if digit not in self.digit_bounds:
+                self.digit_bounds[digit] = self.lit_bounds(glyph)
+        return glyph
+    
+    
+    # The rectangle x, y, w, h holding the lit pixels of a Dots or 7 segment
+    # digit, drawing the digit if need be
+    def generated_bounds(self, digit, draw):
+        digit = int(digit)
+        self.generated_glyph(digit, draw)
+        return self.digit_bounds[digit]
+    
+    
+    # Finds the smallest rectangle x, y, w, h holding all the set pixels of a
+    # 1-bit image the size of the frame buffer, to the nearest 8 pixels across
+    def lit_bounds(self, glyph):
+        row_bytes = self.width // 8
+        x0 = row_bytes
+        x1 = -1
+        y0 = self.height
+        y1 = -1
+        i = 0
+        
+        for y in range(self.height):
+            for b in range(row_bytes):
+                if glyph[i + b]:
+                    if b < x0:
+                        x0 = b
+                    if b > x1:
+                        x1 = b
+                    if y < y0:
+                        y0 = y
+                    y1 = y
+            i = i + row_bytes
+            
+        if x1 < 0:
+            return (0, 0, 0, 0)
+        return (x0 * 8, y0, (x1 - x0 + 1) * 8, y1 - y0 + 1)
+    
+    
     # Display single digits as dots on a 5x7 matrix
     def display_dots(self, digit):
+        self.display_generated(digit, self.draw_dots)
+        
+        
+    def draw_dots(self, fb, digit):
                            
         # Create a small buffer and draw the pixel shape into it
         pixelsize = 24
-        fb = framebuf.FrameBuffer(bytearray(pixelsize*pixelsize*2), pixelsize, pixelsize, framebuf.RGB565)
-        fb.ellipse(12, 12, 11, 11, self.fg_colour, True)
+        dot = framebuf.FrameBuffer(bytearray(pixelsize*pixelsize//8), pixelsize, pixelsize, framebuf.MONO_HLSB)
+        dot.ellipse(12, 12, 11, 11, 1, True)
          
-        # copy the pixel buffer into the LCD frame buffer for each lit dot
-        self.fill(self.black)
-        code = (ord("0") + int(digit)) * 5    # 5 bytes per character
+        # copy the pixel buffer into the digit image for each lit dot
+        code = (ord("0") + digit) * 5    # 5 bytes per character
         for ii in range(5):
             line = FONT[code + 4 - ii]
             for yy in range(8):
                 if (line >> yy) & 0x1:
                     # add the pixel with a little spacing
-                    self.blit(fb, yy*(pixelsize+6)+20, ii*pixelsize+6)
- 
-        self.show()
+                    fb.blit(dot, yy*(pixelsize+6)+20, ii*pixelsize+6)
         
 
 
     def display_7seg(self, digit):
-        digits = [0b1111110, # 0
-                  0b0110000, # 1
-                  0b1101101, # 2
-                  0b1111001, # 3
-                  0b0110011, # 4
-                  0b1011011, # 5
-                  0b0011111, # 6
-                  0b1110000, # 7
-                  0b1111111, # 8
-                  0b1110011] # 9
-                
-        self.fill(self.black)
+        self.display_generated(digit, self.draw_7seg)
+        
         
-        segments = digits[int(digit)]
+    def draw_7seg(self, fb, digit):
+        segments = SEGMENTS[digit]
     
         if (segments & 0x40) > 0:  # segment A
-            self.rect(0,0,24,135, self.fg_colour, True)
+            fb.rect(0,0,24,135, 1, True)
 
         if (segments & 0x20) > 0:  # segment B
-            self.rect(0,0,120,24, self.fg_colour, True)
+            fb.rect(0,0,120,24, 1, True)
 
         if (segments & 0x10) > 0:  # segment C
-            self.rect(116,0,120,24, self.fg_colour, True)
+            fb.rect(116,0,120,24, 1, True)
             
         if (segments & 0x08) > 0:  # segment D
-            self.rect(219,0,24,135, self.fg_colour, True)
+            fb.rect(219,0,24,135, 1, True)
             
         if (segments & 0x04) > 0:  # segment E
-            self.rect(116,115,120,24, self.fg_colour, True)
+            fb.rect(116,115,120,24, 1, True)
             
         if (segments & 0x02) > 0:  # segment F
-            self.rect(0,115,120,24, self.fg_colour, True)
+            fb.rect(0,115,120,24, 1, True)
             
         if (segments & 0x01) > 0:  # segment G
-            self.rect(110,0,24,135, self.fg_colour, True)
+            fb.rect(110,0,24,135, 1, True)
             
-        self.show()
         
     def set_font(self, font):
+        
+        style = self.font_style
                 
         if font==1:
             self.font_style = "Nixie"
@@ -618,8 +1271,21 @@ class Display(framebuf.FrameBuffer):
             self.fg_colour = self.white
         else:
             print("Invalid font number:",font)
+            
+        # The cached digits are only for the previous style. Colour changes don't
+        # matter, as the colour is added when they are shown.
+        # Only the cache in use is kept, to save RAM
+        if self.font_style != style:
+            self.digit_cache.clear()
+            self.glyph_cache.clear()
+            self.digit_bounds.clear()
         
     
+    # Bytes of RAM used by the cached digit images
+    def cache_bytes(self):
+        return self.glyph_cache.used + self.digit_cache.used
+    
+    
     def display_digit(self, digit):
         if self.font_style == "Nixie":
             self.display_nixie(digit)
@@ -631,15 +1297,56 @@ class Display(framebuf.FrameBuffer):
             self.display_7seg(digit)
 
 
+    # As display_digit(), but lets the other tasks run while the picture is sent by
+    # DMA. Streamed Nixie images are sent straight from their files, without DMA
+    async def display_digit_async(self, digit):
+        if (self.font_style == "Nixie") and self.nixie_stream:
+            self.display_nixie(digit)
+        else:
+            self.draw_digit(digit)
+            await self.show_async()
+
+
+    # Draws a digit in the current font into the frame buffer, without showing it
+    def draw_digit(self, digit):
+        if self.font_style == "Nixie":
+            self.draw_nixie(digit)
+            
+        elif self.font_style == "Dots":
+            self.draw_generated(digit, self.draw_dots, self.fg_colour)
+            
+        else:
+            self.draw_generated(digit, self.draw_7seg, self.fg_colour)
+
+
+    # The first time, or if the LCD shows something else or nobody knows what it
+    # shows, the whole LCD is cleared and sent. Once the LCD shows the colon,
+    # blinking it sends just the two 25 x 25 dots, each in its own window,
+    # 2,500 bytes rather than the 64,800 of the whole LCD
     def show_colon(self, digit, visible):
         self.select_digit(digit)
-        self.fill(self.black)
+        key = ("colon", self.fg_colour, visible)
+        shown = self.panel_content[self.selected_digit]
+        
+        if shown == key:
+            return
+        
+        if (shown is None) or (shown[0] != "colon"):
+            self.fill(self.black)
+            if visible:
+                self.ellipse(80, 70, 12, 12, self.fg_colour, True)
+                self.ellipse(150, 70, 12, 12, self.fg_colour, True)
+        else:
+            self.fill_rect(68, 58, 25, 25, self.black)
+            if visible:
+                self.ellipse(80, 70, 12, 12, self.fg_colour, True)
+            self.show()
+            self.fill_rect(138, 58, 25, 25, self.black)
+            if visible:
+                self.ellipse(150, 70, 12, 12, self.fg_colour, True)
         
-        if visible:
-            self.ellipse(80, 70, 12, 12, self.fg_colour, True)
-            self.ellipse(150, 70, 12, 12, self.fg_colour, True)
-            
         self.show()
+        self.panel_content[self.selected_digit] = key
         
             
                            
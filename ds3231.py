@@ -8,32 +8,38 @@ Day_Reg     = 0x03
 Date_Reg    = 0x04
 Month_Reg   = 0x05
 Year_Reg    = 0x06
+Alarm2_Reg  = 0x0b
 Control_Reg = 0x0e
 Status_Reg  = 0x0f
 Aging_Reg   = 0x10
 MSTemp_Reg  = 0x11
 LSTemp_Reg  = 0x12
 
+# BCD conversion tables, e.g. DEC_TO_BCD[59] == 0x59 and BCD_TO_DEC[0x59] == 59
+DEC_TO_BCD = bytes(((n // 10) << 4) | (n % 10) for n in range(100))
+BCD_TO_DEC = bytes((b >> 4) * 10 + (b & 0x0F) for b in range(256))
+
 class DS3231:
     def __init__(self,add = 0x68):
         self.i2c = I2C(1)
         self.address = add 
         self.days_of_week = ["SUN","MON","TUE","WED","THU","FRI","SAT"]
+        self.time_buf = bytearray(7)   # registers 0x00 to 0x06, for read_datetime()
         self.initialise()
                 
     def Read_Reg(self, reg):
-        return self.i2c.readfrom_mem(self.address, reg, 8)[0]
+        return self.i2c.readfrom_mem(self.address, reg, 1)[0]
         
     def Write_Reg(self, reg, data):
         self.i2c.writeto_mem(self.address, reg, bytes([data]))
         
+    # Convert a BCD register value 0x00 to 0x99 to decimal
     def BCD_Convert_DEC(self, code):
-        code1 =(((code & 0xf000)>>12) )*1000  + (((code & 0xf00)>>8) )*100  + (((code & 0xf0)>>4) )*10  + (code & 0x0f)
-        return code1;
+        return BCD_TO_DEC[code]
     
+    # Convert a decimal value 0 to 99 to BCD
     def DEC_Convert_BCD(self, code):
-        code1 = code%10 + ((int(code/10)%10) << 4) + ((int(code/100)%10) << 8) + ((int(code/1000)%10) << 12)
-        return int(code1);
+        return DEC_TO_BCD[code]
     
 
     def initialise(self):
@@ -49,8 +55,8 @@ class DS3231:
         
             # Default time and date
             self.Set_Time(12,00,00)
-            self.Set_Day(0)  # Sunday
-            self.Set_Calendar(2023,01,01)
+            self.Set_Day(7)  # Sunday. The day counts 1 to 7
+            self.Set_Calendar(2023,1,1)
 
     
     # Fine Tune timekeeping
@@ -69,16 +75,16 @@ class DS3231:
         
 
     def Set_Calendar(self,Year,Month,Date):
-        self.Set_Year_BCD(self.DEC_Convert_BCD(Year))
-        self.Set_Month_BCD(self.DEC_Convert_BCD(Month))
-        self.Set_Date_BCD(self.DEC_Convert_BCD(Date))
+        self.Set_Year_BCD(DEC_TO_BCD[Year % 100])
+        self.Set_Month_BCD(DEC_TO_BCD[Month])
+        self.Set_Date_BCD(DEC_TO_BCD[Date])
     
     
     def Read_Calendar(self):
         Calendar = [0,0,0]
-        Calendar[0] = self.BCD_Convert_DEC(self.Read_Year_BCD())
-        Calendar[1] = self.BCD_Convert_DEC(self.Read_Month_BCD())
-        Calendar[2] = self.BCD_Convert_DEC(self.Read_Date_BCD())
+        Calendar[0] = BCD_TO_DEC[self.Read_Year_BCD() & 0xff] + 2000
+        Calendar[1] = BCD_TO_DEC[self.Read_Month_BCD()]
+        Calendar[2] = BCD_TO_DEC[self.Read_Date_BCD()]
         return Calendar
         
     '''Year_Reg     0x06                            '''
@@ -111,30 +117,44 @@ class DS3231:
     def Set_Day(self, vai):
        self.Write_Reg(Day_Reg, vai&0x07)
     
+    '''Alarm 2      0x0B to 0x0D                      '''
+    # Switches the INT pin between the 1Hz square wave and interrupts. With
+    # interrupts, Alarm 2 pulls INT low once a minute, at 0 seconds, until
+    # Clear_Alarm_Flags() is called. Alarm 1's interrupt is left off
+    def Set_Minute_Interrupt(self, enable):
+        control = self.Read_Reg(Control_Reg) & ~0x07
+        if enable:
+            self.i2c.writeto_mem(self.address, Alarm2_Reg, b"\x80\x80\x80")
+            self.Write_Reg(Control_Reg, control | 0x06)     # INTCN and A2IE
+        else:
+            self.Write_Reg(Control_Reg, control)
+        self.Clear_Alarm_Flags()
+    
+    # Clears both alarms' flags, releasing the INT pin. Only Alarm 2 is used
+    def Clear_Alarm_Flags(self):
+        self.Write_Reg(Status_Reg, self.Read_Reg(Status_Reg) & ~0x03)
+    
     '''Hour         0x02                            '''
     def Set_Time_Hour(self, hour):
-        data = self.DEC_Convert_BCD(hour)
-        self.Write_Reg(Hour_Reg, data & 0x3F) 
+        self.Write_Reg(Hour_Reg, DEC_TO_BCD[hour] & 0x3F) 
     
     def Read_Time_Hour(self):
-        return self.BCD_Convert_DEC(self.Read_Reg(Hour_Reg) & 0x3F)
+        return BCD_TO_DEC[self.Read_Reg(Hour_Reg) & 0x3F]
 
     '''Min            0x01                               '''
     def Set_Time_Min(self, minute):
-        data = self.DEC_Convert_BCD(minute)
-        self.Write_Reg(Min_Reg, data & 0x7F)
+        self.Write_Reg(Min_Reg, DEC_TO_BCD[minute] & 0x7F)
         
     def Read_Time_Min (self):
-        return self.BCD_Convert_DEC(self.Read_Reg(Min_Reg)&0x7F)
+        return BCD_TO_DEC[self.Read_Reg(Min_Reg)&0x7F]
 
     '''Sec            0x00                               '''
     def Set_Time_Sec(self, sec):
         print("Setting second=",sec)
-        data = self.DEC_Convert_BCD(sec)
-        self.Write_Reg(Seconds_Reg,data & 0x7F)
+        self.Write_Reg(Seconds_Reg, DEC_TO_BCD[sec] & 0x7F)
     
     def Read_Time_Sec(self):
-        return self.BCD_Convert_DEC(self.Read_Reg(Seconds_Reg)&0x7F)
+        return BCD_TO_DEC[self.Read_Reg(Seconds_Reg)&0x7F]
 
     '''Time          0x02  01  00                        '''
     def Set_Time(self, Hour, Min, Sec):#
@@ -143,8 +163,23 @@ class DS3231:
         self.Set_Time_Hour(Hour)
     
     def Read_Time(self):
-        hr = self.Read_Time_Hour()
-        min = self.Read_Time_Min()
-        sec = self.Read_Time_Sec()
+        _,_,_,_,hr,min,sec = self.read_datetime()
         return hr,min,sec
+
+    '''Date and Time 0x00 to 0x06                      '''
+    # Reads all the time and calendar registers in a single I2C transfer,
+    # so the values are consistent with each other even if the time rolls over.
+    # Returns (year, month, date, day, hour, min, sec)
+    def read_datetime(self):
+        buf = self.time_buf
+        self.i2c.readfrom_mem_into(self.address, Seconds_Reg, buf)
+        
+        sec   = BCD_TO_DEC[buf[Seconds_Reg] & 0x7F]
+        min   = BCD_TO_DEC[buf[Min_Reg] & 0x7F]
+        hour  = BCD_TO_DEC[buf[Hour_Reg] & 0x3F]
+        day   = buf[Day_Reg] & 0x07
+        date  = BCD_TO_DEC[buf[Date_Reg] & 0x3F]
+        month = BCD_TO_DEC[buf[Month_Reg] & 0x1F]
+        year  = BCD_TO_DEC[buf[Year_Reg]] + 2000
+        return year, month, date, day, hour, min, sec
     
\ No newline at end of file
@@ -0,0 +1,120 @@
+#=============================================================
+#=============================================================
+#=============================================================
+# Emulator for running the clock's MicroPython code on a PC.
+#
+# install() creates a model of the clock board and makes the
+# emulated machine, framebuf, neopixel, micropython and rp2 modules
+# importable under their MicroPython names. It also adds the
+# MicroPython-only parts of the time and asyncio modules.
+# After that, display.py, ds3231.py, leds.py and main.py can be
+# imported or run without any changes.
+#
+#   import emulator
+#   board = emulator.install()
+#   import display
+#   LCD = display.Display()
+#   print(board.stats)
+#
+# Or run the whole clock with:  python -m emulator
+#=============================================================
+#=============================================================
+#=============================================================
+
+import asyncio
+import sys
+import time
+
+from . import board as _board
+
+
+TICKS_PERIOD = 1 << 30
+
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) % TICKS_PERIOD
+
+
+def _ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+
+
+# MicroPython's ThreadSafeFlag, which can be set from an interrupt
+# handler, here from any thread, to wake one waiting task. Waking a
+# task counts as the CPU waking up, as it would be idle until then
+class ThreadSafeFlag:
+
+    def __init__(self):
+        self._flag = False
+        self._loop = None
+        self._waiter = None
+
+    def set(self):
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._set)
+        else:
+            self._flag = True
+
+    def _set(self):
+        self._flag = True
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+            _board.current.stats.wakeups += 1
+
+    def clear(self):
+        self._flag = False
+
+    async def wait(self):
+        if not self._flag:
+            self._loop = asyncio.get_running_loop()
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        self._flag = False
+
+
+def _patch_time():
+    start = time.perf_counter()
+    time.ticks_ms = lambda: int((time.perf_counter() - start) * 1000) % TICKS_PERIOD
+    time.ticks_us = lambda: int((time.perf_counter() - start) * 1000000) % TICKS_PERIOD
+    time.ticks_cpu = time.ticks_us
+    time.ticks_add = _ticks_add
+    time.ticks_diff = _ticks_diff
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+
+
+def _patch_asyncio():
+    async def wait_for_ms(aw, timeout):
+        return await asyncio.wait_for(aw, timeout / 1000)
+
+    # A sleep of more than 0ms leaves the CPU idle until its time, if no other task is ready
+    async def sleep_ms(ms):
+        await asyncio.sleep(ms / 1000)
+        if ms > 0:
+            _board.current.stats.wakeups += 1
+
+    asyncio.sleep_ms = sleep_ms
+    asyncio.wait_for_ms = wait_for_ms
+    asyncio.ThreadSafeFlag = ThreadSafeFlag
+
+
+# Set up the emulated board and modules. Returns the Board
+def install():
+    if _board.current is None:
+        _board.current = _board.Board()
+
+        _patch_time()
+        _patch_asyncio()
+
+        from . import machine, framebuf, neopixel, micropython, rp2
+        sys.modules["machine"] = machine
+        sys.modules["rp2"] = rp2
+        sys.modules["framebuf"] = framebuf
+        sys.modules["neopixel"] = neopixel
+        sys.modules["micropython"] = micropython
+
+    return _board.current
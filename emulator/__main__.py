@@ -0,0 +1,119 @@
+#=============================================================
+# Runs the clock on the PC:  python -m emulator [options]
+#
+# Type m, l or r and Enter to press the Mode, Left or Right
+# button, followed by a number of seconds to hold it down for,
+# e.g. "l 5". The bus statistics are printed on exit, in total and
+# per minute.
+#=============================================================
+
+import argparse
+import ast
+import os
+import runpy
+import sys
+import threading
+import time
+
+import emulator
+from emulator import board as _board
+
+FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUTTONS = {"m": _board.MODE_PIN, "l": _board.LEFT_PIN, "r": _board.RIGHT_PIN}
+
+
+def report(board, elapsed, snapshot):
+    print()
+    print("Ran for {0:.1f} seconds".format(elapsed))
+    print(board.stats)
+    minutes = elapsed / 60
+    print("Per minute: {0:.0f} wakeups, {1:.0f} IRQs, {2:.0f} SPI bytes, {3:.0f} I2C bytes".format(
+        board.stats.wakeups / minutes, board.stats.irqs / minutes,
+        board.stats.spi_bytes / minutes, board.stats.i2c_bytes / minutes))
+    for digit in range(6):
+        panel = board.panels[5 - digit]
+        print("LCD {0}: {1} commands, {2} frames, {3} pixels written".format(
+            digit, panel.commands, panel.frames, panel.pixels_written))
+    if snapshot:
+        board.save_ppm(snapshot)
+        print("Saved", snapshot)
+
+
+def read_buttons(board):
+    for line in sys.stdin:
+        words = line.lower().split()
+        button = BUTTONS.get(words[0]) if words else None
+        if button is not None:
+            try:
+                board.press(button, float(words[1]) if len(words) > 1 else 0.1)
+            except ValueError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the LCD Nixie clock on the PC")
+    parser.add_argument("--dir", default=FIRMWARE_DIR,
+                        help="directory standing in for the Pico's flash, holding the font files "
+                             "and settings.json (default: the firmware directory)")
+    parser.add_argument("--seconds", type=float, help="stop after this many seconds")
+    parser.add_argument("--snapshot", help="save a .ppm picture of the LCDs on exit")
+    parser.add_argument("--trace", action="store_true", help="print every bus operation on exit")
+    parser.add_argument("--warmup", type=float, default=0,
+                        help="reset the statistics after this many seconds, so they leave out starting up")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a constant in settings.py, e.g. --set LOW_POWER=True")
+    args = parser.parse_args()
+
+    board = emulator.install()
+    if args.trace:
+        board.trace = []
+
+    sys.path.insert(0, FIRMWARE_DIR)
+    os.chdir(args.dir)
+
+    import settings
+    for setting in args.set:
+        name, value = setting.split("=", 1)
+        if not hasattr(settings, name):
+            parser.error("settings.py has no " + name)
+        setattr(settings, name, ast.literal_eval(value))
+
+    start = time.monotonic()
+
+    def warmed_up():
+        nonlocal start
+        board.stats.reset()
+        start = time.monotonic()
+
+    if args.warmup:
+        timer = threading.Timer(args.warmup, warmed_up)
+        timer.daemon = True
+        timer.start()
+
+    def finish():
+        board.stop()
+        if board.trace:
+            for t, op, nbytes, bus_us in board.trace:
+                print("{0:12.0f}us {1:10} {2:6d} bytes {3:9.1f}us".format(t, op, nbytes, bus_us))
+        report(board, time.monotonic() - start, args.snapshot)
+        sys.stdout.flush()
+        os._exit(0)
+
+    if args.seconds is not None:
+        timer = threading.Timer(args.seconds, finish)
+        timer.daemon = True
+        timer.start()
+
+    threading.Thread(target=read_buttons, args=(board,), daemon=True).start()
+    board.start_rtc()
+
+    try:
+        runpy.run_path(os.path.join(FIRMWARE_DIR, "main.py"), run_name="__main__")
+    except KeyboardInterrupt:
+        pass
+    finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#=============================================================
+# Model of the Waveshare RP2040 LCD clock board.
+#
+# Keeps track of the GPIO levels and interrupt handlers, routes
+# SPI and I2C transfers to the modelled chips, and counts the
+# bytes and bus time used by every transfer.
+#=============================================================
+
+import threading
+import time
+
+from .st7789 import ST7789
+from .ds3231_chip import DS3231Chip
+
+
+# GPIO wiring of the clock board, see settings.py
+CS_PINS     = (2, 3, 4)
+DC_PIN      = 8
+RTC_INT_PIN = 18
+MODE_PIN    = 17
+LEFT_PIN    = 16
+RIGHT_PIN   = 15
+
+RTC_ADDRESS = 0x68
+
+IRQ_FALLING = 4
+IRQ_RISING  = 8
+
+NEOPIXEL_BIT_US = 1.25    # WS2812 bit time at 800kHz
+
+# The board in use, set up by emulator.install()
+current = None
+
+
+#=============================================================
+# Counters for bus traffic, reset with Stats.reset()
+#=============================================================
+class Stats:
+
+    FIELDS = ("spi_transfers", "spi_bytes", "spi_us",
+              "i2c_transfers", "i2c_bytes", "i2c_us",
+              "neopixel_writes", "neopixel_us",
+              "irqs", "wakeups")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for name in self.FIELDS:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __str__(self):
+        return ", ".join("{0}={1}".format(name, round(getattr(self, name), 1)) for name in self.FIELDS)
+
+
+#=============================================================
+# The board
+#=============================================================
+class Board:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.levels = {}      # GPIO number -> 0 or 1
+        self.irqs = {}        # GPIO number -> (handler, trigger, pin object)
+        self.pwm = {}         # GPIO number -> PWM object
+        self.pio_pins = set() # GPIO numbers handed to a PIO
+        self.pio_levels = {}  # GPIO number -> level last output by a PIO
+        self.neopixels = []
+
+        # Set whenever an interrupt fires, to wake machine.idle() and lightsleep()
+        self.irq_event = threading.Event()
+
+        self.stats = Stats()
+        self.trace = None     # set to a list to record every bus operation
+        self.start_time = time.perf_counter()
+
+        # The six LCDs, indexed by chip select address. Address 5 is the left hand digit
+        self.panels = [ST7789() for i in range(6)]
+        self.selected = None
+        self.spi_baudrate = 1_000_000    # set by machine.SPI
+        self.rtc = DS3231Chip()
+        self.i2c_devices = {RTC_ADDRESS: self.rtc}
+
+        self.rtc_thread = None
+        self.running = False
+
+
+    # Record an operation in the trace, if tracing is on
+    def record(self, op, nbytes, bus_us):
+        if self.trace is not None:
+            t = (time.perf_counter() - self.start_time) * 1e6
+            self.trace.append((t, op, nbytes, bus_us))
+
+
+    #---------------------------------------------------------
+    # GPIO
+    #---------------------------------------------------------
+    def get_level(self, gpio):
+        return self.levels.get(gpio, 0)
+
+
+    # Set a pin's level, calling its interrupt handler on a matching edge
+    def set_level(self, gpio, level):
+        level = 1 if level else 0
+        with self.lock:
+            old = self.levels.get(gpio, 0)
+            self.levels[gpio] = level
+            if gpio in CS_PINS:
+                self.chip_select_changed()
+
+        if old != level and gpio in self.irqs:
+            handler, trigger, pin = self.irqs[gpio]
+            if (level and (trigger & IRQ_RISING)) or (not level and (trigger & IRQ_FALLING)):
+                self.stats.irqs += 1
+                handler(pin)
+                self.irq_event.set()
+
+
+    # A PIO sets the level of the pins it drives. Levels for pins not yet
+    # handed to the PIO are kept until they are
+    def set_pio_level(self, gpio, level):
+        self.pio_levels[gpio] = level
+        if gpio in self.pio_pins:
+            self.set_level(gpio, level)
+
+
+    def set_pio_function(self, gpio, pio):
+        if pio:
+            self.pio_pins.add(gpio)
+            if gpio in self.pio_levels:
+                self.set_level(gpio, self.pio_levels[gpio])
+        else:
+            self.pio_pins.discard(gpio)
+
+
+    def set_irq(self, gpio, handler, trigger, pin):
+        if handler is None:
+            self.irqs.pop(gpio, None)
+        else:
+            self.irqs[gpio] = (handler, trigger, pin)
+
+
+    # A machine.Timer has expired. Its callback is an interrupt like a pin's
+    def timer_irq(self, handler, timer):
+        self.stats.irqs += 1
+        handler(timer)
+        self.irq_event.set()
+
+
+    # Press a button for hold_s seconds, without blocking the caller
+    def press(self, gpio, hold_s=0.1):
+        self.set_level(gpio, 1)
+        timer = threading.Timer(hold_s, self.set_level, (gpio, 0))
+        timer.daemon = True
+        timer.start()
+
+
+    # Wait for an interrupt or the timeout. Used by machine.idle() and lightsleep()
+    def sleep(self, timeout_s):
+        self.irq_event.wait(timeout_s)
+        self.irq_event.clear()
+        self.stats.wakeups += 1
+
+
+    #---------------------------------------------------------
+    # SPI to the LCDs. The chip select pins are decoded to
+    # select one of the six LCDs. Address 7 selects none.
+    #---------------------------------------------------------
+    def chip_select_changed(self):
+        address = 0
+        for bit, gpio in enumerate(CS_PINS):
+            address |= self.levels.get(gpio, 0) << bit
+        panel = self.panels[address] if address < len(self.panels) else None
+
+        if panel is not self.selected:
+            if self.selected is not None:
+                self.selected.deselect()
+            self.selected = panel
+
+
+    def spi_write(self, baudrate, data):
+        nbytes = len(data)
+        bus_us = nbytes * 8 * 1e6 / baudrate
+        self.stats.spi_transfers += 1
+        self.stats.spi_bytes += nbytes
+        self.stats.spi_us += bus_us
+        self.record("spi", nbytes, bus_us)
+
+        with self.lock:
+            if self.selected is not None:
+                self.selected.receive(data, self.levels.get(DC_PIN, 0))
+
+
+    #---------------------------------------------------------
+    # I2C
+    #---------------------------------------------------------
+    def i2c_device(self, addr):
+        device = self.i2c_devices.get(addr)
+        if device is None:
+            raise OSError(19)    # ENODEV, as MicroPython does
+        return device
+
+
+    def i2c_count(self, op, nbytes, freq):
+        # start, address and register bytes, a restart for reads, 9 clocks a byte
+        bus_us = (nbytes + 2) * 9 * 1e6 / freq
+        self.stats.i2c_transfers += 1
+        self.stats.i2c_bytes += nbytes
+        self.stats.i2c_us += bus_us
+        self.record(op, nbytes, bus_us)
+
+
+    def i2c_read(self, addr, reg, nbytes, freq):
+        self.i2c_count("i2c_read", nbytes, freq)
+        with self.lock:
+            return self.i2c_device(addr).read(reg, nbytes)
+
+
+    def i2c_write(self, addr, reg, data, freq):
+        self.i2c_count("i2c_write", len(data), freq)
+        with self.lock:
+            device = self.i2c_device(addr)
+            device.write(reg, data)
+        if device is self.rtc and not self.rtc.square_wave_enabled():
+            self.set_level(RTC_INT_PIN, self.rtc.int_level())
+
+
+    #---------------------------------------------------------
+    # NeoPixels
+    #---------------------------------------------------------
+    def neopixel_write(self, nbytes):
+        bus_us = nbytes * 8 * NEOPIXEL_BIT_US
+        self.stats.neopixel_writes += 1
+        self.stats.neopixel_us += bus_us
+        self.record("neopixel", nbytes, bus_us)
+
+
+    #---------------------------------------------------------
+    # The DS3231 clock. Advances the time once a second, and
+    # pulses the 1Hz output if it is enabled. Otherwise the
+    # INT pin follows the alarm flags.
+    #---------------------------------------------------------
+    def rtc_tick(self):
+        with self.lock:
+            self.rtc.tick()
+            square_wave = self.rtc.square_wave_enabled()
+        if square_wave:
+            self.set_level(RTC_INT_PIN, 1)
+            self.set_level(RTC_INT_PIN, 0)
+        else:
+            self.set_level(RTC_INT_PIN, self.rtc.int_level())
+
+
+    def start_rtc(self):
+        self.running = True
+
+        def run():
+            next_tick = time.monotonic() + 1
+            while self.running:
+                time.sleep(max(0, next_tick - time.monotonic()))
+                next_tick += 1
+                self.rtc_tick()
+
+        self.rtc_thread = threading.Thread(target=run, daemon=True)
+        self.rtc_thread.start()
+
+
+    def stop(self):
+        self.running = False
+
+
+    #---------------------------------------------------------
+    # Pictures of the LCDs
+    #---------------------------------------------------------
+
+    # Save all six LCDs, left to right and upright, as a binary .ppm image
+    def save_ppm(self, filename):
+        gap = 8
+        images = [self.panels[5 - digit].upright_rgb() for digit in range(6)]
+        width = ST7789.HEIGHT
+        height = ST7789.WIDTH
+        total_width = 6 * width + 5 * gap
+
+        rows = []
+        for y in range(height):
+            row = bytearray()
+            for digit, image in enumerate(images):
+                if digit:
+                    row += bytes(3 * gap)
+                row += image[y * width * 3:(y + 1) * width * 3]
+            rows.append(bytes(row))
+
+        with open(filename, "wb") as f:
+            f.write("P6\n{0} {1}\n255\n".format(total_width, height).encode())
+            f.write(b"".join(rows))
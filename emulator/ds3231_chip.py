@@ -0,0 +1,116 @@
+#=============================================================
+# Model of the DS3231 real time clock's registers.
+#
+# The time starts at the PC's local time and is advanced once
+# a second by Board.rtc_tick(). Alarms 1 and 2 set their flags
+# and, with INTCN set, pull the INT pin low.
+#=============================================================
+
+import datetime
+
+SECONDS_REG = 0x00
+ALARM1_REG  = 0x07
+ALARM2_REG  = 0x0B
+CONTROL_REG = 0x0E
+STATUS_REG  = 0x0F
+NUM_REGS    = 0x13
+
+
+def to_bcd(n):
+    return ((n // 10) << 4) | (n % 10)
+
+
+def from_bcd(b):
+    return (b >> 4) * 10 + (b & 0x0F)
+
+
+class DS3231Chip:
+
+    def __init__(self, now=None):
+        self.regs = bytearray(NUM_REGS)
+        self.set_datetime(now or datetime.datetime.now())
+
+
+    # Register reads and writes auto-increment, wrapping round at the end
+    def read(self, reg, nbytes):
+        return bytes(self.regs[(reg + i) % NUM_REGS] for i in range(nbytes))
+
+
+    def write(self, reg, data):
+        for i, b in enumerate(bytes(data)):
+            self.regs[(reg + i) % NUM_REGS] = b
+
+
+    def set_datetime(self, dt):
+        r = self.regs
+        r[0] = to_bcd(dt.second)
+        r[1] = to_bcd(dt.minute)
+        r[2] = to_bcd(dt.hour)
+        r[3] = dt.isoweekday()            # 1 = Monday to 7 = Sunday, as the clock uses
+        r[4] = to_bcd(dt.day)
+        r[5] = to_bcd(dt.month)
+        r[6] = to_bcd(dt.year % 100)
+
+
+    # The time in the registers, or None if they don't hold a valid date
+    def get_datetime(self):
+        r = self.regs
+        try:
+            return datetime.datetime(2000 + from_bcd(r[6]), from_bcd(r[5] & 0x1F), from_bcd(r[4] & 0x3F),
+                                     from_bcd(r[2] & 0x3F), from_bcd(r[1] & 0x7F), from_bcd(r[0] & 0x7F))
+        except ValueError:
+            return None
+
+
+    # Advance the time by one second. The day of the week counts 1 to 7
+    def tick(self):
+        dt = self.get_datetime()
+        if dt is None:
+            return
+        day = self.regs[3]
+        dt = dt + datetime.timedelta(seconds=1)
+        self.set_datetime(dt)
+        self.regs[3] = day if dt.hour or dt.minute or dt.second else day % 7 + 1
+        if self.alarm1_matches():
+            self.regs[STATUS_REG] |= 0x01
+        if self.alarm2_matches():
+            self.regs[STATUS_REG] |= 0x02
+
+
+    # Alarm 1 matches the time. Only the match on seconds, minutes, hours and
+    # day of the week, as the clock uses, and once a second are modelled
+    def alarm1_matches(self):
+        r = self.regs
+        a = r[ALARM1_REG:ALARM1_REG + 4]
+        if a[0] & 0x80:
+            return True
+        if a[3] & 0x80:
+            day_matches = True
+        elif a[3] & 0x40:
+            day_matches = (a[3] & 0x0F) == r[3]
+        else:
+            day_matches = (a[3] & 0x3F) == r[4]
+        return day_matches and (a[0], a[1] & 0x7F, a[2] & 0x3F) == (r[0], r[1], r[2])
+
+
+    # Alarm 2 matches the time. It has no seconds register, so can only match at
+    # 0 seconds. Only once a minute and the match on minutes and hours are modelled
+    def alarm2_matches(self):
+        r = self.regs
+        a = r[ALARM2_REG:ALARM2_REG + 3]
+        if r[0] != 0:
+            return False
+        if a[0] & 0x80:
+            return True
+        return (a[0] & 0x7F) == r[1] and ((a[1] & 0x80) or (a[1] & 0x3F) == r[2])
+
+
+    # The level of the INT pin when it isn't giving the square wave: low while
+    # an alarm whose interrupt is enabled has its flag set
+    def int_level(self):
+        return 0 if self.regs[CONTROL_REG] & self.regs[STATUS_REG] & 0x03 else 1
+
+
+    # The 1Hz square wave is output when INTCN is clear and RS2/RS1 select 1Hz
+    def square_wave_enabled(self):
+        return (self.regs[CONTROL_REG] & 0x1C) == 0
@@ -0,0 +1,266 @@
+#=============================================================
+# Emulation of MicroPython's framebuf module.
+#
+# Supports the RGB565, GS8 and monochrome formats. RGB565 pixels
+# are stored little-endian, as they are on the Pico. The attributes
+# are private, as the real FrameBuffer has none that a subclass
+# could clash with.
+#=============================================================
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+RGB565 = 1
+GS2_HMSB = 5
+GS4_HMSB = 2
+GS8 = 6
+
+MVLSB = MONO_VLSB
+
+
+_mono_tables = {}
+
+
+# Lookup table expanding a byte of a MONO_HLSB image into 8 RGB565 pixels
+def _mono_table(c0, c1):
+    table = _mono_tables.get((c0, c1))
+    if table is None:
+        colours = [bytes((c & 0xFF, c >> 8)) for c in (c0, c1)]
+        table = [b"".join(colours[(b >> (7 - i)) & 1] for i in range(8)) for b in range(256)]
+        _mono_tables[(c0, c1)] = table
+    return table
+
+
+class FrameBuffer:
+
+    def __init__(self, buffer, width, height, format, stride=None):
+        self._buf = buffer
+        self._width = width
+        self._height = height
+        self._format = format
+        self._stride = width if stride is None else stride
+
+
+    #---------------------------------------------------------
+    # Single pixels
+    #---------------------------------------------------------
+    def _set(self, x, y, c):
+        f = self._format
+        if f == RGB565:
+            i = (y * self._stride + x) * 2
+            self._buf[i] = c & 0xFF
+            self._buf[i + 1] = (c >> 8) & 0xFF
+        elif f == GS8:
+            self._buf[y * self._stride + x] = c & 0xFF
+        elif f == MONO_VLSB:
+            i = (y >> 3) * self._stride + x
+            bit = 1 << (y & 7)
+            self._buf[i] = (self._buf[i] | bit) if c & 1 else (self._buf[i] & ~bit)
+        elif f in (MONO_HLSB, MONO_HMSB):
+            i = (y * self._stride + x) >> 3
+            bit = (0x80 >> (x & 7)) if f == MONO_HLSB else (1 << (x & 7))
+            self._buf[i] = (self._buf[i] | bit) if c & 1 else (self._buf[i] & ~bit)
+        else:
+            raise ValueError("unsupported framebuf format")
+
+    def _get(self, x, y):
+        f = self._format
+        if f == RGB565:
+            i = (y * self._stride + x) * 2
+            return self._buf[i] | (self._buf[i + 1] << 8)
+        elif f == GS8:
+            return self._buf[y * self._stride + x]
+        elif f == MONO_VLSB:
+            return (self._buf[(y >> 3) * self._stride + x] >> (y & 7)) & 1
+        elif f in (MONO_HLSB, MONO_HMSB):
+            b = self._buf[(y * self._stride + x) >> 3]
+            return (b >> (7 - (x & 7))) & 1 if f == MONO_HLSB else (b >> (x & 7)) & 1
+        raise ValueError("unsupported framebuf format")
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            return None
+        if c is None:
+            return self._get(x, y)
+        self._set(x, y, c)
+
+
+    #---------------------------------------------------------
+    # Filled areas. RGB565 rows are filled with slice copies for speed
+    #---------------------------------------------------------
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self._width)
+        y1 = min(y + h, self._height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        if self._format == RGB565:
+            row = bytes((c & 0xFF, (c >> 8) & 0xFF)) * (x1 - x0)
+            for yy in range(y0, y1):
+                i = (yy * self._stride + x0) * 2
+                self._buf[i:i + len(row)] = row
+        else:
+            for yy in range(y0, y1):
+                for xx in range(x0, x1):
+                    self._set(xx, yy, c)
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self._width, self._height, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+        else:
+            self.hline(x, y, w, c)
+            self.hline(x, y + h - 1, w, c)
+            self.vline(x, y, h, c)
+            self.vline(x + w - 1, y, h, c)
+
+
+    #---------------------------------------------------------
+    # Lines and shapes
+    #---------------------------------------------------------
+    def line(self, x1, y1, x2, y2, c):
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    # Quadrant mask bits as in MicroPython: 1 = top right, 2 = top left,
+    # 4 = bottom left, 8 = bottom right
+    def ellipse(self, x, y, xr, yr, c, f=False, m=15):
+        if xr == 0 and yr == 0:
+            if m & 15:
+                self.pixel(x, y, c)
+            return
+
+        rx2 = max(xr, 1) ** 2
+        ry2 = max(yr, 1) ** 2
+        for dy in range(-yr, yr + 1):
+            for dx in range(-xr, xr + 1):
+                inside = dx * dx * ry2 + dy * dy * rx2 <= rx2 * ry2
+                if not inside:
+                    continue
+                if not f:
+                    # Outline only: skip points whose neighbours are all inside
+                    edge = False
+                    for ex, ey in ((dx + 1, dy), (dx - 1, dy), (dx, dy + 1), (dx, dy - 1)):
+                        if ex * ex * ry2 + ey * ey * rx2 > rx2 * ry2:
+                            edge = True
+                    if not edge:
+                        continue
+                quadrant = (1 if dy <= 0 else 8) if dx >= 0 else (2 if dy <= 0 else 4)
+                if m & quadrant:
+                    self.pixel(x + dx, y + dy, c)
+
+    def poly(self, x, y, coords, c, f=False):
+        points = [(x + coords[i], y + coords[i + 1]) for i in range(0, len(coords), 2)]
+        if f:
+            ys = [p[1] for p in points]
+            for yy in range(min(ys), max(ys) + 1):
+                crossings = []
+                for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]):
+                    if (ya <= yy < yb) or (yb <= yy < ya):
+                        crossings.append(xa + (yy - ya) * (xb - xa) / (yb - ya))
+                crossings.sort()
+                for i in range(0, len(crossings) - 1, 2):
+                    xa = int(round(crossings[i]))
+                    xb = int(round(crossings[i + 1]))
+                    self.hline(xa, yy, xb - xa + 1, c)
+        for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]):
+            self.line(xa, ya, xb, yb, c)
+
+    # Text isn't used by the clock. Each character is drawn as an 8x8 box outline
+    def text(self, s, x, y, c=1):
+        for i, ch in enumerate(s):
+            if ch != " ":
+                self.rect(x + 8 * i + 1, y, 6, 7, c)
+
+
+    #---------------------------------------------------------
+    # Copying
+    #---------------------------------------------------------
+    def scroll(self, xstep, ystep):
+        old = FrameBuffer(bytearray(self._buf), self._width, self._height, self._format, self._stride)
+        for yy in range(self._height):
+            for xx in range(self._width):
+                sx = xx - xstep
+                sy = yy - ystep
+                if 0 <= sx < self._width and 0 <= sy < self._height:
+                    self._set(xx, yy, old._get(sx, sy))
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, tuple):
+            fbuf = FrameBuffer(*fbuf)
+
+        x0 = max(0, -x)
+        y0 = max(0, -y)
+        x1 = min(fbuf._width, self._width - x)
+        y1 = min(fbuf._height, self._height - y)
+
+        # Straight row copies when the formats match and there is no key or palette
+        if fbuf._format == RGB565 == self._format and key == -1 and palette is None:
+            for yy in range(y0, y1):
+                src = (yy * fbuf._stride + x0) * 2
+                dst = ((y + yy) * self._stride + x + x0) * 2
+                n = (x1 - x0) * 2
+                self._buf[dst:dst + n] = fbuf._buf[src:src + n]
+            return
+
+        # 1-bit images coloured by a palette, as used for text and the generated digits.
+        # Each source byte is expanded to 8 pixels with a lookup table
+        if fbuf._format == MONO_HLSB and self._format == RGB565 and palette is not None \
+                and key == -1 and x0 == 0 and x1 == fbuf._width:
+            table = _mono_table(palette._get(0, 0), palette._get(1, 0))
+            n = x1 * 2
+            for yy in range(y0, y1):
+                src = yy * ((fbuf._stride + 7) // 8)
+                row = b"".join(table[b] for b in fbuf._buf[src:src + (x1 + 7) // 8])
+                dst = ((y + yy) * self._stride + x) * 2
+                self._buf[dst:dst + n] = row[:n]
+            return
+
+        # The same, with the pixels of palette colour 0 left transparent. Only set bits are copied
+        if fbuf._format == MONO_HLSB and self._format == RGB565 and palette is not None \
+                and key == palette._get(0, 0) != palette._get(1, 0) and x0 == 0 and x1 == fbuf._width:
+            c = palette._get(1, 0)
+            pixel = bytes((c & 0xFF, c >> 8))
+            for yy in range(y0, y1):
+                src = yy * ((fbuf._stride + 7) // 8)
+                dst = ((y + yy) * self._stride + x) * 2
+                for i, bits in enumerate(fbuf._buf[src:src + (x1 + 7) // 8]):
+                    if bits == 0:
+                        continue
+                    for bit in range(min(8, x1 - i * 8)):
+                        if bits & (0x80 >> bit):
+                            p = dst + (i * 8 + bit) * 2
+                            self._buf[p:p + 2] = pixel
+            return
+
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                c = fbuf._get(xx, yy)
+                if palette is not None:
+                    c = palette._get(c, 0)
+                if c != key:
+                    self._set(x + xx, y + yy, c)
@@ -0,0 +1,211 @@
+#=============================================================
+# Emulation of the parts of MicroPython's machine module used
+# by the clock: Pin, SPI, I2C, PWM, Timer, mem32, idle() and
+# lightsleep()
+#=============================================================
+
+import threading
+
+from . import board as _board
+
+
+def _current():
+    return _board.current
+
+
+class Pin:
+
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    ALT_PIO0 = 6
+    ALT_PIO1 = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = _board.IRQ_FALLING
+    IRQ_RISING = _board.IRQ_RISING
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, alt=-1):
+        self.id = id
+        self.mode = mode
+        if mode == Pin.ALT and alt in (Pin.ALT_PIO0, Pin.ALT_PIO1):
+            _current().set_pio_function(id, True)
+        elif mode != -1:
+            _current().set_pio_function(id, False)
+        if value is not None:
+            self.value(value)
+
+    # Writes are ignored while the PIO drives the pin
+    def value(self, x=None):
+        if x is None:
+            return _current().get_level(self.id)
+        if self.id not in _current().pio_pins:
+            _current().set_level(self.id, x)
+
+    def __call__(self, x=None):
+        return self.value(x)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        _current().set_irq(self.id, handler, trigger, self)
+
+    def __repr__(self):
+        return "Pin({0})".format(self.id)
+
+
+class SPI:
+
+    def __init__(self, id, baudrate=1_000_000, polarity=0, phase=0, bits=8, firstbit=0,
+                 sck=None, mosi=None, miso=None):
+        self.id = id
+        self.baudrate = baudrate
+        _current().spi_baudrate = baudrate
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            self.baudrate = baudrate
+            _current().spi_baudrate = baudrate
+
+    def write(self, buf):
+        _current().spi_write(self.baudrate, buf)
+
+    def read(self, nbytes, write=0x00):
+        _current().spi_write(self.baudrate, bytes([write]) * nbytes)
+        return bytes(nbytes)
+
+    def readinto(self, buf, write=0x00):
+        _current().spi_write(self.baudrate, bytes([write]) * len(buf))
+        for i in range(len(buf)):
+            buf[i] = 0
+
+    def write_readinto(self, write_buf, read_buf):
+        _current().spi_write(self.baudrate, write_buf)
+        for i in range(len(read_buf)):
+            read_buf[i] = 0
+
+    def deinit(self):
+        pass
+
+
+class I2C:
+
+    def __init__(self, id, scl=None, sda=None, freq=400_000, timeout=50000):
+        self.id = id
+        self.freq = freq
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        return _current().i2c_read(addr, memaddr, nbytes, self.freq)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        data = _current().i2c_read(addr, memaddr, len(buf), self.freq)
+        buf[:] = data
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        _current().i2c_write(addr, memaddr, buf, self.freq)
+
+    def scan(self):
+        return sorted(_current().i2c_devices)
+
+
+class PWM:
+
+    def __init__(self, dest, freq=None, duty_u16=None):
+        self.pin = dest
+        self._freq = 0
+        self._duty = 0
+        _current().pwm[dest.id] = self
+        if freq is not None:
+            self.freq(freq)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+
+    def deinit(self):
+        self._duty = 0
+
+
+# Memory mapped registers. Reads return 0, so e.g. the SPI is never busy, and
+# writes are ignored
+class _Memory:
+
+    def __getitem__(self, address):
+        return 0
+
+    def __setitem__(self, address, value):
+        pass
+
+
+# A software timer. The callback is run on a thread, as the pin interrupt handlers are
+class Timer:
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._timer = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self.deinit()
+        self._mode = mode
+        self._period_s = 1 / freq if freq > 0 else period / 1000
+        self._callback = callback
+        self._start()
+
+    def deinit(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start(self):
+        self._timer = threading.Timer(self._period_s, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self):
+        if self._mode == Timer.PERIODIC:
+            self._start()
+        if self._callback is not None:
+            _current().timer_irq(self._callback, self)
+
+
+mem8 = _Memory()
+mem16 = _Memory()
+mem32 = _Memory()
+
+
+# Wait for an interrupt. On the Pico this also wakes every millisecond for the system tick
+def idle():
+    _current().sleep(0.001)
+
+
+def lightsleep(time_ms=None):
+    _current().sleep(None if time_ms is None else time_ms / 1000)
+
+
+def freq(hz=None):
+    return 125_000_000
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def unique_id():
+    return b"EMULATOR"
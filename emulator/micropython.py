@@ -0,0 +1,32 @@
+#=============================================================
+# Emulation of MicroPython's micropython module
+#=============================================================
+
+
+def const(x):
+    return x
+
+
+# Code emitter decorators. On the PC the code just runs as normal Python
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    print("mem_info() is not available in the emulator")
+
+
+def opt_level(level=None):
+    return 0
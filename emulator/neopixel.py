@@ -0,0 +1,38 @@
+#=============================================================
+# Emulation of MicroPython's neopixel module
+#=============================================================
+
+from . import board as _board
+
+
+class NeoPixel:
+
+    ORDER = (1, 0, 2, 3)    # GRB(W), as WS2812 LEDs expect
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.writes = 0
+        _board.current.neopixels.append(self)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for k in range(self.bpp):
+            self.buf[offset + self.ORDER[k]] = v[k]
+
+    def __getitem__(self, i):
+        offset = i * self.bpp
+        return tuple(self.buf[offset + self.ORDER[k]] for k in range(self.bpp))
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        self.writes += 1
+        _board.current.neopixel_write(len(self.buf))
@@ -0,0 +1,86 @@
+#=============================================================
+# Models of the PIO programs used by the clock.
+#
+# Each model is given the words put into its state machine and
+# does what the program would do with them, setting the pins
+# and sending bytes to the board.
+#=============================================================
+
+
+class LcdPioModel:
+    """lcd_pio.py's program: header words setting the chip select
+    and DC pins through out(pins, 30), byte counts, then bytes in
+    the top 8 bits of each word, sent at 18 PIO cycles a byte."""
+
+    CYCLES_PER_BYTE = 18
+
+    def __init__(self, board, freq, pins):
+        self.board = board
+        self.out_base = pins["out_base"]
+        self.baudrate = freq * 8 / self.CYCLES_PER_BYTE
+        self.running = False
+        self.fifo = []       # words waiting while the state machine is stopped
+        self.osr = 0
+        self.state = "header"
+        self.remaining = 0
+
+    def run(self, running):
+        self.running = running
+        if running:
+            words = self.fifo
+            self.fifo = []
+            self.put_words(words)
+
+    # out(pins, count) with the shift direction left: the top bits of the OSR
+    def out_pins(self, count):
+        value = self.osr >> (32 - count)
+        for i in range(count):
+            self.board.set_pio_level((self.out_base + i) % 32, (value >> i) & 1)
+
+    def exec(self, instruction):
+        if instruction == "pull()":
+            if self.fifo:
+                self.osr = self.fifo.pop(0)
+        elif instruction == "out(pins,30)":
+            self.out_pins(30)
+        elif not instruction.startswith("out(pindirs,"):
+            raise NotImplementedError("can't exec " + instruction)
+
+    def put_words(self, words):
+        if not self.running:
+            self.fifo.extend(words)
+            return
+        for word in words:
+            if self.state == "header":
+                self.osr = word
+                self.out_pins(30)
+                self.state = "count"
+            elif self.state == "count":
+                self.remaining = word
+                self.state = "data" if word else "header"
+            else:
+                self.board.spi_write(self.baudrate, bytes(((word >> 24) & 0xFF,)))
+                self.remaining -= 1
+                if not self.remaining:
+                    self.state = "header"
+
+    # Bytes put with a shift of 24 arrive in the top 8 bits, so are sent as they are
+    def put_buffer(self, buf, shift):
+        data = memoryview(buf)
+        if not self.running or shift != 24:
+            self.put_words([(b << shift) & 0xFFFFFFFF for b in data])
+            return
+        while len(data):
+            if self.state != "data":
+                self.put_words((data[0] << 24,))
+                data = data[1:]
+                continue
+            n = min(self.remaining, len(data))
+            self.board.spi_write(self.baudrate, data[:n])
+            data = data[n:]
+            self.remaining -= n
+            if not self.remaining:
+                self.state = "header"
+
+
+MODELS = {"lcd_pio": LcdPioModel}
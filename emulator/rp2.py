@@ -0,0 +1,150 @@
+#=============================================================
+# Emulation of the parts of MicroPython's rp2 module used by
+# the clock.
+#
+# DMA transfers to the SPI1 data register are run on a thread,
+# which takes as long as the real transfer would at the SPI's
+# baud rate, then hands the bytes to the board. The CPU, i.e.
+# the caller, carries on meanwhile, as it does on the Pico.
+#
+# PIO programs aren't run. Instead, each program the clock
+# uses has a model of what it does with the words put into
+# its state machine, see pio_models.py.
+#=============================================================
+
+import threading
+import time
+
+from . import board as _board
+
+SPI1_SSPDR = 0x40040008
+
+
+class DMA:
+
+    def __init__(self):
+        self._read = None
+        self._write = None
+        self._count = 0
+        self._ctrl = None
+        self._active = False
+        self._handler = None
+        self._thread = None
+
+    # The real pack_ctrl() packs the fields into an int. Only config() uses it here
+    def pack_ctrl(self, default=None, **kwargs):
+        ctrl = dict(default or {})
+        ctrl.update(kwargs)
+        return ctrl
+
+    def unpack_ctrl(self, ctrl):
+        return dict(ctrl)
+
+    def config(self, read=None, write=None, count=None, ctrl=None, trigger=False):
+        if read is not None:
+            self._read = read
+        if write is not None:
+            self._write = write
+        if count is not None:
+            self._count = count
+        if ctrl is not None:
+            self._ctrl = ctrl
+        if trigger:
+            self.active(True)
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        if value and not self._active:
+            if self._write != SPI1_SSPDR:
+                raise ValueError("the emulator only supports DMA to the SPI1 data register")
+            self._active = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def irq(self, handler=None, hard=False):
+        self._handler = handler
+
+    def close(self):
+        self._handler = None
+
+    def _run(self):
+        board = _board.current
+        data = memoryview(self._read)[:self._count]
+        time.sleep(len(data) * 8 / board.spi_baudrate)
+        board.spi_write(board.spi_baudrate, data)
+        self._active = False
+        if self._handler is not None and not (self._ctrl or {}).get("irq_quiet", True):
+            self._handler(self)
+
+
+#=============================================================
+# PIO
+#=============================================================
+class PIO:
+
+    IN_LOW = 0
+    IN_HIGH = 1
+    OUT_LOW = 2
+    OUT_HIGH = 3
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+    def __init__(self, id):
+        self.id = id
+
+
+# The program isn't assembled. Only its name and settings are kept, to find its model
+class _Program:
+
+    def __init__(self, name, settings):
+        self.name = name
+        self.settings = settings
+
+
+def asm_pio(**settings):
+    def assemble(func):
+        return _Program(func.__name__, settings)
+    return assemble
+
+
+class StateMachine:
+
+    def __init__(self, id, program=None, freq=125_000_000, **kwargs):
+        self.id = id
+        self.model = None
+        if program is not None:
+            self.init(program, freq, **kwargs)
+
+    def init(self, program, freq=125_000_000, **kwargs):
+        from . import pio_models
+        model = pio_models.MODELS.get(program.name)
+        if model is None:
+            raise NotImplementedError("no model of the PIO program " + program.name)
+        pins = {name: pin.id for name, pin in kwargs.items() if name.endswith("_base")}
+        self.model = model(_board.current, freq, pins)
+
+    def active(self, value=None):
+        if value is None:
+            return self.model.running
+        self.model.run(bool(value))
+
+    # Put an int, or each item of a buffer, into the TX FIFO
+    def put(self, value, shift=0):
+        if isinstance(value, int):
+            self.model.put_words(((value << shift) & 0xFFFFFFFF,))
+        else:
+            self.model.put_buffer(value, shift)
+
+    # Only the instructions the clock executes directly are understood
+    def exec(self, instruction):
+        self.model.exec(instruction.replace(" ", ""))
+
+    def tx_fifo(self):
+        return 0
+
+    def rx_fifo(self):
+        return 0
@@ -0,0 +1,157 @@
+#=============================================================
+# Model of one ST7789 LCD controller.
+#
+# Decodes the command and data bytes sent over SPI, keeps the
+# column and row address window set by CASET/RASET, and writes
+# RAMWR pixel data into the controller's memory.
+#
+# Only the 240 x 135 area the clock uses, starting at column 40,
+# row 53 with the rotation set by MADCTL 0x70, is kept.
+#=============================================================
+
+CASET  = 0x2A
+RASET  = 0x2B
+RAMWR  = 0x2C
+MADCTL = 0x36
+COLMOD = 0x3A
+SLPIN  = 0x10
+SLPOUT = 0x11
+INVOFF = 0x20
+INVON  = 0x21
+DISPOFF = 0x28
+DISPON = 0x29
+SWRESET = 0x01
+
+
+class ST7789:
+
+    WIDTH = 240
+    HEIGHT = 135
+    X_OFFSET = 40
+    Y_OFFSET = 53
+
+    def __init__(self):
+        self.memory = bytearray(self.WIDTH * self.HEIGHT * 2)
+        self.reset()
+
+
+    def reset(self):
+        self.command = None
+        self.params = bytearray()
+        self.madctl = 0
+        self.colmod = 0
+        self.sleeping = True
+        self.display_on = False
+        self.inverted = False
+        self.x0 = 0
+        self.x1 = self.WIDTH - 1
+        self.y0 = 0
+        self.y1 = self.HEIGHT - 1
+        self.x = 0
+        self.y = 0
+        self.pending = None      # first byte of a pixel split between two writes
+
+        self.commands = 0        # number of commands received
+        self.frames = 0          # number of RAMWR commands
+        self.pixels_written = 0
+
+
+    # Chip select released. This ends any memory write
+    def deselect(self):
+        if self.command == RAMWR:
+            self.command = None
+        self.pending = None
+
+
+    # Bytes received over SPI. dc is 0 for a command byte, 1 for data
+    def receive(self, data, dc):
+        if not dc:
+            for cmd in bytes(data):
+                self.start_command(cmd)
+        elif self.command == RAMWR:
+            self.write_pixels(memoryview(data))
+        elif self.command is not None:
+            self.params += data
+            self.parameters()
+
+
+    def start_command(self, cmd):
+        self.commands += 1
+        self.command = cmd
+        self.params = bytearray()
+        self.pending = None
+
+        if cmd == RAMWR:
+            self.frames += 1
+            self.x = self.x0
+            self.y = self.y0
+        elif cmd == SLPOUT:
+            self.sleeping = False
+        elif cmd == SLPIN:
+            self.sleeping = True
+        elif cmd == DISPON:
+            self.display_on = True
+        elif cmd == DISPOFF:
+            self.display_on = False
+        elif cmd == INVON:
+            self.inverted = True
+        elif cmd == INVOFF:
+            self.inverted = False
+        elif cmd == SWRESET:
+            self.reset()
+
+
+    # Act on a command's parameters once they have all arrived
+    def parameters(self):
+        p = self.params
+        if self.command == CASET and len(p) >= 4:
+            self.x0 = ((p[0] << 8) | p[1]) - self.X_OFFSET
+            self.x1 = ((p[2] << 8) | p[3]) - self.X_OFFSET
+        elif self.command == RASET and len(p) >= 4:
+            self.y0 = ((p[0] << 8) | p[1]) - self.Y_OFFSET
+            self.y1 = ((p[2] << 8) | p[3]) - self.Y_OFFSET
+        elif self.command == MADCTL and len(p) >= 1:
+            self.madctl = p[0]
+        elif self.command == COLMOD and len(p) >= 1:
+            self.colmod = p[0]
+
+
+    # Write RGB565 pixel data into the address window, a row at a time.
+    # data is a memoryview, so the rows are copied without making copies
+    # of the data first, which would show up in benchmark.py's heap figures
+    def write_pixels(self, data):
+        if self.pending is not None:
+            data = memoryview(bytes([self.pending]) + bytes(data))
+            self.pending = None
+        if len(data) & 1:
+            self.pending = data[-1]
+            data = data[:-1]
+
+        pos = 0
+        while pos < len(data) and self.y <= self.y1:
+            count = min((self.x1 - self.x + 1) * 2, len(data) - pos)
+            if (0 <= self.y < self.HEIGHT) and (0 <= self.x) and (self.x1 < self.WIDTH):
+                start = (self.y * self.WIDTH + self.x) * 2
+                self.memory[start:start + count] = data[pos:pos + count]
+            pos += count
+            self.x += count // 2
+            self.pixels_written += count // 2
+            if self.x > self.x1:
+                self.x = self.x0
+                self.y += 1
+
+
+    # The colour of one pixel, as an RGB565 value
+    def pixel(self, x, y):
+        i = (y * self.WIDTH + x) * 2
+        return (self.memory[i] << 8) | self.memory[i + 1]
+
+
+    # The picture as 8 bit RGB, rotated upright as the LCD is mounted in the clock
+    def upright_rgb(self):
+        out = bytearray()
+        for x in range(self.WIDTH):
+            for y in range(self.HEIGHT - 1, -1, -1):
+                c = self.pixel(x, y)
+                out += bytes(((c >> 8) & 0xF8, (c >> 3) & 0xFC, (c << 3) & 0xF8))
+        return out
@@ -0,0 +1,243 @@
+#=============================================================
+#=============================================================
+#=============================================================
+# Event queue, fed by the DS3231 1Hz interrupt and the button
+# interrupts. The main loop waits here for something to happen,
+# sleeping the CPU in between, rather than polling continuously.
+#
+# The Up and Down buttons' presses are posted straight from their
+# pin interrupts, then while they are held down a timer checks
+# them every POLL_MS, to post repeats which get faster the
+# longer they are held. The Mode button is checked the same way,
+# and posts a press when it is let go, or a long press instead
+# if it is held for LONG_PRESS_MS.
+#=============================================================
+#=============================================================
+#=============================================================
+
+import time
+import machine
+import settings
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# Event codes
+TICK  = 1
+MODE  = 2
+LEFT  = 3
+RIGHT = 4
+
+# Added to a button's event code for a repeat, or for a button which doesn't
+# repeat, when it has been held for LONG_PRESS_MS instead of being let go.
+# e.g. LEFT | REPEAT. button() removes them again
+REPEAT = 0x40
+LONG   = 0x80
+
+# Ring buffer of event codes. Written only by the interrupt handlers
+# and read only by the main loop, so no locking is needed
+QUEUE_SIZE = 16
+queue = bytearray(QUEUE_SIZE)
+head = 0    # next slot to write
+tail = 0    # next slot to read
+
+# Button presses this soon after the button was let go are treated as switch bounce
+DEBOUNCE_MS = 50
+
+# How often a button being held down is checked
+POLL_MS = 20
+
+LONG_PRESS_MS = 1000
+
+# Auto-repeat starts this long after the press, at REPEAT_START_MS intervals. Each
+# interval is an eighth shorter than the one before, down to REPEAT_MIN_MS
+REPEAT_DELAY_MS = 500
+REPEAT_START_MS = 200
+REPEAT_MIN_MS = 20
+
+# The attached buttons
+buttons = []
+
+# Number of times the CPU has woken up from sleep, or a task waiting in
+# wait_async() has been woken, while waiting for an event
+wakeups = 0
+
+# Set whenever an event is posted, to wake up a task waiting in wait_async()
+flag = asyncio.ThreadSafeFlag()
+
+
+# Add an event to the queue. Called from interrupt handlers.
+# If the queue is full the event is dropped.
+def post(event):
+    global head
+    next_head = (head + 1) % QUEUE_SIZE
+    if next_head != tail:
+        queue[head] = event
+        head = next_head
+        flag.set()
+
+
+# The button an event came from, without the REPEAT and LONG flags
+def button(event):
+    return event & 0x3F
+
+
+# Returns the next event from the queue, or None if it is empty
+def get():
+    global tail
+    if tail == head:
+        return None
+    event = queue[tail]
+    tail = (tail + 1) % QUEUE_SIZE
+    return event
+
+
+# True if there are events waiting in the queue
+def pending():
+    return tail != head
+
+
+# Throw away any events waiting in the queue
+def clear():
+    global tail
+    tail = head
+
+
+# Wait for the next event and return it, sleeping the CPU until an
+# interrupt arrives. Returns None if timeout_ms passes first. The CPU
+# is put in lightsleep if light_sleep is True, by default if
+# settings.LIGHT_SLEEP is set, but not while a button is held down, as
+# its timer would stop and miss it being let go
+def wait(timeout_ms=None, light_sleep=None):
+    global wakeups
+    start = time.ticks_ms()
+    
+    if light_sleep is None:
+        light_sleep = settings.LIGHT_SLEEP
+
+    while True:
+        event = get()
+        if event is not None:
+            return event
+
+        if timeout_ms is None:
+            remaining = 1000
+        else:
+            remaining = timeout_ms - time.ticks_diff(time.ticks_ms(), start)
+            if remaining <= 0:
+                return None
+
+        if light_sleep and not held():
+            machine.lightsleep(min(remaining, 1000))
+        else:
+            machine.idle()
+        wakeups = wakeups + 1
+
+
+# Wait for the next event and return it, letting other asyncio tasks run
+# meanwhile. Returns None if timeout_ms passes first.
+async def wait_async(timeout_ms=None):
+    global wakeups
+    start = time.ticks_ms()
+
+    while True:
+        event = get()
+        if event is not None:
+            return event
+
+        if timeout_ms is None:
+            await flag.wait()
+        else:
+            remaining = timeout_ms - time.ticks_diff(time.ticks_ms(), start)
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for_ms(flag.wait(), remaining)
+            except asyncio.TimeoutError:
+                wakeups = wakeups + 1
+                return None
+        wakeups = wakeups + 1
+
+
+# One button, pulling its pin high while pressed
+class Button:
+
+    def __init__(self, pin, event, repeat):
+        self.pin = pin
+        self.event = event
+        self.repeat = repeat
+        self.timer = machine.Timer()
+        self.held = False
+        self.long = False
+        self.pressed = 0        # ticks_ms() when pressed, polled and let go
+        self.polled = 0
+        self.released = time.ticks_add(time.ticks_ms(), -DEBOUNCE_MS)
+        self.interval = REPEAT_START_MS
+        self.next_repeat = 0
+        pin.irq(trigger=machine.Pin.IRQ_RISING, handler=self.press)
+
+
+    # Pin interrupt. Edges while the button is held are switch bounce, unless
+    # the timer has stopped, as it may in lightsleep, and missed it being let go.
+    # The times are only compared if recent, as ticks_ms() wraps after 12 days
+    def press(self, pin):
+        now = time.ticks_ms()
+        if self.held and (0 <= time.ticks_diff(now, self.polled) < 4 * POLL_MS):
+            return
+        if 0 <= time.ticks_diff(now, self.released) < DEBOUNCE_MS:
+            return
+        if self.held and not (self.repeat or self.long):
+            post(self.event)    # the last press, let go while the timer was stopped
+        
+        self.held = True
+        self.long = False
+        self.pressed = now
+        self.polled = now
+        self.interval = REPEAT_START_MS
+        self.next_repeat = time.ticks_add(now, REPEAT_DELAY_MS)
+        if self.repeat:
+            post(self.event)
+        self.timer.init(mode=machine.Timer.ONE_SHOT, period=POLL_MS, callback=self.poll)
+
+
+    # Timer callback, every POLL_MS while the button is held
+    def poll(self, timer):
+        now = time.ticks_ms()
+        self.polled = now
+        
+        if not self.pin.value():
+            self.held = False
+            self.released = now
+            if not (self.repeat or self.long):
+                post(self.event)
+            return
+        
+        if self.repeat:
+            if time.ticks_diff(now, self.next_repeat) >= 0:
+                post(self.event | REPEAT)
+                self.next_repeat = time.ticks_add(now, self.interval)
+                self.interval = max(self.interval - self.interval // 8, REPEAT_MIN_MS)
+        
+        elif (not self.long) and (time.ticks_diff(now, self.pressed) >= LONG_PRESS_MS):
+            self.long = True
+            post(self.event | LONG)
+        
+        self.timer.init(mode=machine.Timer.ONE_SHOT, period=POLL_MS, callback=self.poll)
+
+
+# Set up a button pin to post the given event each time it is pressed. With
+# repeat, it is also posted with REPEAT while the button is held down. Otherwise
+# it is posted when the button is let go, or with LONG instead if it is held
+# down for LONG_PRESS_MS, so a long press doesn't also act as a short one
+def attach_button(pin, event, repeat=False):
+    buttons.append(Button(pin, event, repeat))
+
+
+# True while any button is held down
+def held():
+    for b in buttons:
+        if b.held:
+            return True
+    return False
@@ -1,39 +1,163 @@
+#===============================================
+# Converts .png images into the RGB565 .raw and compressed .rle
+# files used by display.py for the Nixie font.
+#
+# Usage:
+#   python animation_convert.py                 convert every .png in this directory
+#   python animation_convert.py 0.png 1.png     convert the given files
+#   python animation_convert.py myfont/ -o out  convert a directory into another one
+#
+# Images should be 240 x 135 pixels, i.e. the digit rotated 90 degrees
+# anticlockwise. Use --rotate to convert upright 135 x 240 images instead.
+#
+# Needs the pypng and numpy packages.
+#===============================================
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
 import png
 
-prefix = ""
 suffix = ".png"
 newsuffix = ".raw"
-num_images = 10
+rlesuffix = ".rle"
+
+LCD_WIDTH = 240
+LCD_HEIGHT = 135
+
+
+# Load a .png file as a height x width x 3 array of 8 bit RGB values. It is read
+# as RGBA, as pypng won't convert images with an alpha channel to RGB, and the
+# alpha values are dropped
+def load_image (infile):
+    width, height, rows, info = png.Reader(filename=infile).asRGBA8()
+    pixels = numpy.vstack([numpy.frombuffer(row, dtype=numpy.uint8) for row in rows])
+    return pixels.reshape(height, width, 4)[..., :3]
+
+
+# Pack an array of RGB values into big-endian RGB565 bytes, as sent to the LCD
+def rgb_to_rgb565 (pixels):
+    r = pixels[..., 0]
+    g = pixels[..., 1]
+    b = pixels[..., 2]
+
+    packed = numpy.empty(pixels.shape[:-1] + (2,), dtype=numpy.uint8)
+    packed[..., 0] = (r & 0xF8) | ((g & 0xE0) >> 5)
+    packed[..., 1] = ((g & 0x1C) << 3) | ((b & 0xF8) >> 3)
+    return packed.tobytes()
+
+
+# Compress RGB565 image data into the .rle format read by Display.decode_rle().
+# "R565", width and height (16 bit big-endian), then packets of either
+# a control byte n < 128 followed by n+1 literal pixels, or
+# a control byte n >= 128 followed by one pixel repeated n-126 times
+def rle_encode (data, width, height):
+    out = bytearray(b"R565")
+    out += bytes([width >> 8, width & 0xFF, height >> 8, height & 0xFF])
+
+    # Find the start and length of every run of identical pixels
+    pixels = numpy.frombuffer(data, dtype=">u2")
+    starts = numpy.flatnonzero(numpy.diff(pixels, prepend=-1) != 0)
+    lengths = numpy.diff(starts, append=len(pixels))
 
-def convert_all_files ():
-    for i in range (0, num_images):
-        convert_file (i)
+    literal = bytearray()
+    count = 0
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        while length > 0:
+            run = min(length, 129)
+            if run >= 2:
+                if count:
+                    out.append(count - 1)
+                    out += literal
+                    literal = bytearray()
+                    count = 0
+                out.append(run + 126)
+                out += data[start*2:start*2+2]
+            else:
+                literal += data[start*2:start*2+2]
+                count += 1
+                if count == 128:
+                    out.append(127)
+                    out += literal
+                    literal = bytearray()
+                    count = 0
+            start += run
+            length -= run
 
-def color_to_bytes (color):
-    r, g, b = color
-    arr = bytearray(2)
-    arr[0] = r & 0xF8
-    arr[0] += (g & 0xE0) >> 5
-    arr[1] = (g & 0x1C) << 3
-    arr[1] += (b & 0xF8) >> 3
-    return arr
+    if count:
+        out.append(count - 1)
+        out += literal
+    return out
 
 
-def convert_file (file_number):
-    infile = prefix+"{0}".format(file_number)+suffix
-    outfile = prefix+"{0}".format(file_number)+newsuffix
-    png_reader=png.Reader(infile)
-    image_data = png_reader.asRGBA8()
+# Convert one .png file, writing the .raw and optionally the .rle file into outdir
+def convert_file (infile, outdir, rotate=False, rle=True):
+    pixels = load_image(infile)
+    if rotate:
+        pixels = numpy.rot90(pixels)
 
+    height, width = pixels.shape[:2]
+    if (width, height) != (LCD_WIDTH, LCD_HEIGHT):
+        print("Warning: {0} is {1} x {2} pixels, expected {3} x {4}".format(
+            infile, width, height, LCD_WIDTH, LCD_HEIGHT))
+
+    raw = rgb_to_rgb565(pixels)
+    name = os.path.splitext(os.path.basename(infile))[0]
+
+    outfile = os.path.join(outdir, name + newsuffix)
     with open(outfile, "wb") as file:
+        file.write(raw)
+
+    if rle:
+        with open(os.path.join(outdir, name + rlesuffix), "wb") as file:
+            file.write(rle_encode(raw, width, height))
+
+    return outfile
+
+
+# Expand the command line paths into a list of .png files
+def find_images (paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images += sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(suffix))
+        else:
+            images.append(path)
+    return images
+
+
+# Convert all the files, in parallel processes if there are several of them
+def convert_all_files (images, outdir=None, rotate=False, rle=True, jobs=None):
+    if outdir is not None:
+        os.makedirs(outdir, exist_ok=True)
+    outdirs = [outdir if outdir is not None else os.path.dirname(infile) for infile in images]
+
+    if jobs == 1 or len(images) < 2:
+        return [convert_file(infile, out, rotate, rle) for infile, out in zip(images, outdirs)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        n = len(images)
+        return list(pool.map(convert_file, images, outdirs, [rotate] * n, [rle] * n))
+
 
-        for row in image_data[2]:
-            for r, g, b, a in zip(row[::4], row[1::4], row[2::4], row[3::4]):
-                # convert to (RGB565)
-                img_bytes = color_to_bytes ((r,g,b))
-                file.write(img_bytes)
-    file.close()
+def main ():
+    parser = argparse.ArgumentParser(description="Convert .png images to RGB565 .raw and .rle font files")
+    parser.add_argument("paths", nargs="*", default=["."],
+                        help=".png files or directories of them (default: current directory)")
+    parser.add_argument("-o", "--output-dir", help="where to write the output files (default: next to each image)")
+    parser.add_argument("-r", "--rotate", action="store_true",
+                        help="rotate upright images 90 degrees anticlockwise first")
+    parser.add_argument("--no-rle", action="store_true", help="don't write compressed .rle files")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes to use (default: one per CPU)")
+    args = parser.parse_args()
 
+    images = find_images(args.paths)
+    for outfile in convert_all_files(images, args.output_dir, args.rotate, not args.no_rle, args.jobs):
+        print("Wrote", outfile)
 
 
-convert_all_files()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#=============================================================
+#=============================================================
+#=============================================================
+# PIO driver for the LCDs, used instead of the hardware SPI
+# when settings.LCD_BACKEND is "pio".
+#
+# The PIO state machine drives the clock and data lines, and
+# also the three chip select lines and the DC line, so the CPU
+# doesn't have to set them around every transfer. It can also
+# run the clock faster than the 25MHz used with hardware SPI.
+#
+# The state machine is sent a stream of 32 bit words. Each
+# transfer is:
+#   a header word, setting the chip select and DC pins
+#   the number of bytes that follow
+#   the bytes, one per word, in the top 8 bits
+# A transfer of no bytes just sets the pins, e.g. to release
+# the chip select.
+#
+# The chip select and DC pins aren't next to the data pin, but
+# the PIO's output pins wrap around from GPIO 31 to GPIO 0, so
+# out(pins, 30) from the data pin (GPIO 11) reaches GPIO 11-31
+# and 0-8. Only the pins handed to the PIO are changed.
+#=============================================================
+#=============================================================
+#=============================================================
+
+from machine import Pin,mem32
+import rp2
+import settings
+
+
+# The pins set by the header word
+CS_PINS = (settings.CS1_PIN, settings.CS2_PIN, settings.CS3_PIN)
+HEADER_PINS = CS_PINS + (settings.DC_PIN,)
+NO_LCD = 7     # chip select address which selects none of the LCDs
+
+# PIO0 state machine 0's pin control register, and its OUT pin count field
+SM0_PINCTRL = 0x502000DC
+PINCTRL_OUT_COUNT_LSB = 20
+
+
+# The bit of the header word which sets a pin. out(pins, 30) takes the top
+# 30 bits of the word, the lowest of those going to the data pin
+def pin_bit(gpio):
+    return 1 << (((gpio - settings.DIN_PIN) % 32) + 2)
+
+
+# Sends each byte most significant bit first, changing the data pin while the
+# clock is low, as for SPI mode 0. Each bit takes two cycles, so the clock runs
+# at half the state machine frequency
+@rp2.asm_pio(out_shiftdir=rp2.PIO.SHIFT_LEFT, sideset_init=rp2.PIO.OUT_LOW,
+             out_init=rp2.PIO.OUT_LOW, fifo_join=rp2.PIO.JOIN_TX)
+def lcd_pio():
+    wrap_target()
+    label("start")
+    pull()                      .side(0)    # header word
+    out(pins, 30)               .side(0)    # set the chip select and DC pins
+    pull()                      .side(0)    # number of bytes
+    mov(x, osr)                 .side(0)
+    jmp(not_x, "start")         .side(0)
+    jmp(x_dec, "byte")          .side(0)    # x = bytes - 1
+    label("byte")
+    pull()                      .side(0)
+    set(y, 6)                   .side(0)
+    label("bit")
+    out(pins, 1)                .side(0)
+    jmp(y_dec, "bit")           .side(1)
+    out(pins, 1)                .side(0)    # last bit of the byte
+    jmp(x_dec, "byte")          .side(1)
+    wrap()
+
+
+class PioLcd:
+
+    def __init__(self, freq):
+        self.sm = rp2.StateMachine(0, lcd_pio, freq=freq,
+                                   sideset_base=Pin(settings.CLK_PIN),
+                                   out_base=Pin(settings.DIN_PIN))
+
+        # MicroPython sets up one output pin. Widen that to the 30 reached by the header
+        mem32[SM0_PINCTRL] = (mem32[SM0_PINCTRL] & ~(0x3F << PINCTRL_OUT_COUNT_LSB)) | \
+                             (30 << PINCTRL_OUT_COUNT_LSB)
+
+        # Header words for each chip select address, with DC low and high
+        self.headers = []
+        for address in range(8):
+            word = 0
+            for bit in range(3):
+                if (address >> bit) & 1:
+                    word = word | pin_bit(CS_PINS[bit])
+            self.headers.append(word)
+        self.dc_bit = pin_bit(settings.DC_PIN)
+
+        # Set the chip select and DC pins to release the LCDs, make them outputs,
+        # then hand them over to the PIO
+        directions = pin_bit(settings.DIN_PIN)
+        for gpio in HEADER_PINS:
+            directions = directions | pin_bit(gpio)
+        self.sm.put(self.headers[NO_LCD] | self.dc_bit)
+        self.sm.exec("pull()")
+        self.sm.exec("out(pins, 30)")
+        self.sm.put(directions)
+        self.sm.exec("pull()")
+        self.sm.exec("out(pindirs, 30)")
+        for gpio in HEADER_PINS:
+            Pin(gpio, Pin.ALT, alt=Pin.ALT_PIO0)
+
+        self.sm.active(1)
+
+
+    # Send buf to the LCD with chip select address `address`, with the DC pin
+    # low for a command or high for data. The chip select is left asserted
+    def send(self, address, dc, buf):
+        header = self.headers[address]
+        if dc:
+            header = header | self.dc_bit
+        self.sm.put(header)
+        self.sm.put(len(buf))
+        self.sm.put(buf, 24)
+
+
+    # Release the chip select, leaving DC high
+    def release(self):
+        self.sm.put(self.headers[NO_LCD] | self.dc_bit)
+        self.sm.put(0)
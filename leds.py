@@ -1,16 +1,38 @@
 from machine import Pin
 import neopixel
+import time
+import array
+import _thread
 import settings
 
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
 
 rgb_strip = neopixel.NeoPixel(Pin(settings.NEOPIXEL_PIN), 6)
 
 full = 40   # RGB LCD brightness. 10=low, 255=max.
 half = int(full / 2)
+
+NUM_PATTERNS = 12        # user selectable patterns 0 to 11
+ANIMATED_PATTERNS = (11,)
+ALARM_PATTERN = 12       # bright white, flashed by the alarm
+
+FRAME_MS = 33            # animation frame time, i.e. 30 frames per second
+
+rgb_mode = 0             # the current pattern
+late_frames = 0          # number of animation frames that missed their time
+changed = asyncio.Event()
+
+RGB_ORDER = (0, 1, 2)
     
     
 #-----------------------------------------------------------------------------
-# Converts HSV color to rgb tuple and returns it.
+# Converts HSV color to rgb, and stores r, g and b in buf at
+# offset+order[0], offset+order[1] and offset+order[2]. No memory is allocated,
+# so this is safe to use on the second core.
 # The logic is almost the same as in Adafruit NeoPixel library:
 # https://github.com/adafruit/Adafruit_NeoPixel so all the credits for that
 # go directly to them (license: https://github.com/adafruit/Adafruit_NeoPixel/blob/master/COPYING)
@@ -18,11 +40,8 @@ half = int(full / 2)
 # hue: Hue component. Should be on interval 0..65535
 # sat: Saturation component. Should be on interval 0..255
 # val: Value component. Should be on interval 0..255
-# returns: (r, g, b) tuple
 #-----------------------------------------------------------------------------
-def colourHSV(hue, sat, val):
-    """
-    """
+def hsv_into(buf, offset, order, hue, sat, val):
     if hue >= 65536:
         hue %= 65536
 
@@ -64,66 +83,201 @@ def colourHSV(hue, sat, val):
     g = ((((g * s1) >> 8) + s2) * v1) >> 8
     b = ((((b * s1) >> 8) + s2) * v1) >> 8
 
-    return r, g, b
+    buf[offset + order[0]] = r
+    buf[offset + order[1]] = g
+    buf[offset + order[2]] = b
+
+
+# Converts HSV color to rgb tuple and returns it.
+def colourHSV(hue, sat, val):
+    rgb = bytearray(3)
+    hsv_into(rgb, 0, RGB_ORDER, hue, sat, val)
+    return rgb[0], rgb[1], rgb[2]
+
 
 
+# Pattern colours as r,g,b bytes for each of the 6 LEDs, or None for animated patterns
+def solid(r, g, b):
+    return bytes((r, g, b) * 6)
+
+def rainbow():
+    colours = bytearray(18)
+    hue = 0
+    for i in range(0,6):
+        hsv_into(colours, i*3, RGB_ORDER, hue, 255, full)
+        hue = hue + 10000         # difference of colurs between LEDs
+    return bytes(colours)
+
+PATTERN_COLOURS = [
+    solid(0,0,0),                                   # 0 off
+    solid(full,0,0),                                # 1 red
+    solid(0,full,0),                                # 2 green
+    solid(0,0,full),                                # 3 blue
+    solid(half,half,0),                             # 4 yellow
+    solid(0,half,half),                             # 5 cyan
+    solid(half,0,half),                             # 6 magenta
+    solid(50,6,0),                                  # 7 amber
+    solid(int(2.0*half), half, int(0.5*half)),      # 8 whiteish
+    rainbow(),                                      # 9 rainbow
+    bytes((full,0,0, 0,0,full) * 3),                # 10 red/blue alternate
+    None,                                           # 11 rotating rainbow
+    solid(255,255,255),                             # 12 alarm
+]
+
+
+# Sets one LED in the strip's buffer, without writing it out
+def set_led(i, r, g, b):
+    buf = rgb_strip.buf
+    order = rgb_strip.ORDER
+    offset = i * rgb_strip.bpp
+    buf[offset + order[0]] = r
+    buf[offset + order[1]] = g
+    buf[offset + order[2]] = b
+
+
+# Draws a pattern on the LEDs. frame is the animation frame number, for
+# animated patterns. No memory is allocated, so this is safe to use on the second core.
+def draw_pattern(rgbmode, frame):
+    colours = PATTERN_COLOURS[rgbmode]
+    
+    if colours is not None:
+        for i in range(0,6):
+            set_led(i, colours[i*3], colours[i*3+1], colours[i*3+2])
+            
+    elif rgbmode == 11:   # rotating rainbow
+        hue = frame * 512
+        for i in range(0,6):
+            hsv_into(rgb_strip.buf, i * rgb_strip.bpp, rgb_strip.ORDER, hue, 255, full)
+            hue = hue + 10000
+            
+    rgb_strip.write()
 
+
+# Changes the LED pattern. If the second core is animating the LEDs,
+# the new pattern is passed on to it
 def set_rgb_pattern(rgbmode):
+    global rgb_mode
+    rgb_mode = rgbmode
+    
+    if core1_running:
+        send_pattern(rgbmode)
+    else:
+        draw_pattern(rgbmode, 0)
+        changed.set()
+
+
+# Follow the RGB mode setting when it is changed
+settings.on_change("rgb_mode", set_rgb_pattern)
+
+
+#-----------------------------------------------------------------------------
+# asyncio task which animates the LEDs every FRAME_MS milliseconds,
+# while an animated pattern is selected
+#-----------------------------------------------------------------------------
+async def animate():
+    global late_frames
+    frame = 0
+    
+    while True:
+        if rgb_mode not in ANIMATED_PATTERNS:
+            # Nothing to do until the pattern is changed
+            changed.clear()
+            await changed.wait()
             
-    if rgbmode == 0:	# off
-        rgb_strip.fill((0,0,0))
-        rgb_strip.write()
+        next_frame = time.ticks_ms()
+        while rgb_mode in ANIMATED_PATTERNS:
+            draw_pattern(rgb_mode, frame)
+            frame = frame + 1
+                
+            next_frame = time.ticks_add(next_frame, FRAME_MS)
+            delay = time.ticks_diff(next_frame, time.ticks_ms())
+            if delay < 0:
+                late_frames = late_frames + 1
+                next_frame = time.ticks_ms()
+                delay = 0
+            await asyncio.sleep_ms(delay)
+
 
-    elif rgbmode == 1:	# red
-        rgb_strip.fill((full,0,0))
-        rgb_strip.write()
+#-----------------------------------------------------------------------------
+# Second core LED animation.
+#
+# The second core owns the LEDs and draws a frame every FRAME_MS milliseconds.
+# Pattern changes are passed to it through the mailbox, a ring buffer which
+# only the first core writes to and only the second core reads from, with the
+# indexes kept in a bytearray. Neither side needs a lock, and nothing on
+# the second core allocates memory, so the garbage collector never runs there.
+#-----------------------------------------------------------------------------
+MAILBOX_SLOTS = 8
+mailbox = bytearray(MAILBOX_SLOTS)
 
-    elif rgbmode == 2: # green
-        rgb_strip.fill((0,full,0))
-        rgb_strip.write()
+HEAD = 0    # next mailbox slot to write. Only changed by the first core
+TAIL = 1    # next mailbox slot to read. Only changed by the second core
+RUN  = 2    # cleared to stop the second core
+control = bytearray(3)
 
-    elif rgbmode == 3: # blue
-        rgb_strip.fill((0,0,full))
-        rgb_strip.write()
+FRAMES = 0  # frames drawn by the second core
+LATE   = 1  # frames that missed their time
+core1_stats = array.array("I", [0, 0])
 
-    elif rgbmode == 4: # yellow
-        rgb_strip.fill((half,half,0))
-        rgb_strip.write()
+core1_running = False
 
-    elif rgbmode == 5: # cyan
-        rgb_strip.fill((0,half,half))
-        rgb_strip.write()
 
-    elif rgbmode == 6: # magenta
-        rgb_strip.fill((half,0,half))
-        rgb_strip.write()
+# Puts a pattern change in the mailbox. Returns False if the mailbox is full
+def send_pattern(rgbmode):
+    head = control[HEAD]
+    next_head = (head + 1) % MAILBOX_SLOTS
+    if next_head == control[TAIL]:
+        return False
+    
+    mailbox[head] = rgbmode
+    control[HEAD] = next_head    # publish the new pattern after it is written
+    return True
 
-    elif rgbmode == 7: # amber
-        rgb_strip.fill((50,6,0))
-        rgb_strip.write()
 
-    elif rgbmode == 8: # whiteish
-        rgb_strip.fill((int(2.0*half), half, int(0.5*half)))
-        rgb_strip.write()
+# The animation loop which runs on the second core until stop_core1() is called
+def core1_loop(rgbmode):
+    frame = 0
+    draw_pattern(rgbmode, frame)
+    next_frame = time.ticks_ms()
+    
+    while control[RUN]:
         
-    elif rgbmode == 9:   # rainbow
-        hue = 0
-        for i in range(0,6):
-            rgb_strip.__setitem__(i,colourHSV(hue, 255, full))
-            hue = hue + 10000         # difference of colurs between LEDs                    
-        rgb_strip.write()
-
-    elif rgbmode == 10:   # red/blue alternate
-        colour1 = (full,0,0)
-        colour2 = (0,0,full)
-        rgb_strip.__setitem__(0,colour1)
-        rgb_strip.__setitem__(1,colour2)
-        rgb_strip.__setitem__(2,colour1)
-        rgb_strip.__setitem__(3,colour2)
-        rgb_strip.__setitem__(4,colour1)
-        rgb_strip.__setitem__(5,colour2)
-        rgb_strip.write()
-                                    
- 
- 
- 
+        # Pick up the latest pattern change, if any
+        tail = control[TAIL]
+        if tail != control[HEAD]:
+            while tail != control[HEAD]:
+                rgbmode = mailbox[tail]
+                tail = (tail + 1) % MAILBOX_SLOTS
+            control[TAIL] = tail
+            frame = 0
+            draw_pattern(rgbmode, frame)
+            
+        elif rgbmode in ANIMATED_PATTERNS:
+            frame = (frame + 1) & 0xFFFF
+            draw_pattern(rgbmode, frame)
+            core1_stats[FRAMES] = (core1_stats[FRAMES] + 1) & 0x3FFFFFFF
+            
+        next_frame = time.ticks_add(next_frame, FRAME_MS)
+        delay = time.ticks_diff(next_frame, time.ticks_ms())
+        if delay < 0:
+            core1_stats[LATE] = (core1_stats[LATE] + 1) & 0x3FFFFFFF
+            next_frame = time.ticks_ms()
+            delay = 0
+        time.sleep_ms(delay)
+
+
+# Start animating the LEDs on the second core
+def start_core1():
+    global core1_running
+    control[HEAD] = 0
+    control[TAIL] = 0
+    control[RUN] = 1
+    core1_running = True
+    _thread.start_new_thread(core1_loop, (rgb_mode,))
+
+
+# Ask the second core to stop animating the LEDs. It finishes within one frame
+def stop_core1():
+    global core1_running
+    control[RUN] = 0
+    core1_running = False
@@ -6,19 +6,9 @@ import time
 
 
 # This is based on a binary image file (RGB565) with the same dimensions as the screen
-# updates the global display_buffer directly
+# updates the global display_buffer directly, reading the file straight into it
 def blit_image_file (filename):
-    
-    position = 0
-    blocksize = 1024
-    
-    with open (filename, "rb") as file:
-        chunk = file.read(blocksize)        
-        while chunk:
-            #print(position)
-            LCD.buffer[position:position+len(chunk)] = chunk
-            chunk = file.read(blocksize)
-            position = position + len(chunk)
+    LCD.read_raw(filename)
     
 
 LCD = display.Display()
@@ -1,10 +1,18 @@
 import time
 from machine import Pin,PWM
 
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
 import settings
 import display
 import ds3231
 import leds
+import events
+import transitions
+import alarms
 
 
 #=======================================================================
@@ -14,29 +22,15 @@ import leds
 #=======================================================================
 
 
+# Called each second by the DS3231's 1Hz output, or once a minute by its
+# alarm interrupt in low power mode
 def rtc_1hz_interrupt(pin):
-    global tick
-    tick = True
-    
-
-def get_button():
-    if (btn_mode_pin.value()):
-        return "M"
-    
-    if (btn_left_pin.value()):
-        return "L"
+    events.post(events.TICK)
     
-    if (btn_right_pin.value()):
-        return "R"
-    
-    else:
-        return None
 
-    
-    
-def adjust_simple_setting(setting_name, min_value, max_value, display_function):
+async def adjust_simple_setting(setting_name, min_value, max_value, display_function):
     value = settings.get_setting(setting_name)
-    new_value, timeout = set(value, min_value, max_value, display_function)
+    new_value, timeout = await set(value, min_value, max_value, display_function)
     settings.save_setting(setting_name, new_value)
 
     return new_value, timeout
@@ -52,50 +46,52 @@ def display_int(number, position, digits):
 
 
 # Allows the user to change a setting value with the up and down buttons.
+# Holding either down repeats it, faster the longer it is held.
 #
-# Returns the new value and True if no button pressed after a few seconds
-# or the new value and False if the mode button is pressed
+# Returns the new value and True if no button pressed after a few seconds,
+# or the mode button is held down, or the new value and False if the mode
+# button is pressed
 #
 # Calls the callback display_function each time the value is changed to show it on
 # the LCDs in whatever format is appropriate for the data type
-def set(initial_value, min_value, max_value, display_function):
+async def set(initial_value, min_value, max_value, display_function):
     new_value = initial_value
     previous_value = -1
     start_time = time.ticks_ms() 
     
+    # The queue isn't cleared, so presses made while this screen was being
+    # drawn still count. Any ticks waiting in it are ignored
     while True:
 
-        # If a setting has changed. call the supplied function to display the new setting 
-        if (new_value != previous_value):
+        # If a setting has changed. call the supplied function to display the new setting.
+        # Any repeats already waiting are counted first, so the display keeps up with them
+        if (new_value != previous_value) and not events.pending():
             if (display_function):
                 display_function(new_value)
-                time.sleep(0.2)
 
             previous_value = new_value            
 
-        # Respond to any button pressed
-        btn = get_button()
+        # Wait for a button press. If none for 5 seconds, timeout and return
+        event = await events.wait_async(5000 - time.ticks_diff(time.ticks_ms(), start_time))
+        if event is None:
+            return new_value, True
                     
-        if (btn == "L"):  # UP Button Pressed. Increment the value
+        if (events.button(event) == events.LEFT):  # UP Button pressed or held. Increment the value
             start_time = time.ticks_ms() 
             new_value = new_value+1
             if (new_value > max_value):
                 new_value = min_value
                 
-        elif (btn == "R"):  # DOWN button pressed. Decrement the value
+        elif (events.button(event) == events.RIGHT):  # DOWN button pressed or held. Decrement the value
             start_time = time.ticks_ms() 
             new_value = new_value-1
             if (new_value < min_value):
                 new_value = max_value
                 
-        elif (btn == "M"):  # Mode Button Pressed. Return
+        elif (event == events.MODE):  # Mode Button Pressed. Return
             break
-
-        else:
-            time.sleep(0.1)
         
-        # if no buttons pressed for a while, timeout and return
-        if time.ticks_ms() > (start_time + 5000): # 5 seconds
+        elif (event == events.MODE | events.LONG):  # Mode Button held down. Back to the time
             return new_value, True
     
     return new_value, False
@@ -137,6 +133,16 @@ def fn_display_font(value):
     LCD.display_text(mode)
 
     
+def fn_display_days(value):
+    LCD.select_digit(5)
+    LCD.display_text(alarms.DAY_NAMES[value])
+
+
+def fn_display_weekday(value):
+    LCD.select_digit(5)
+    LCD.display_text(alarms.WEEKDAY_NAMES[value-1])
+
+
 def fn_display_hour(value):
     display_int(value,2,2)
     
@@ -162,8 +168,8 @@ def fn_display_adjust_timing(value):
 #==============================================================================
 #==============================================================================
       
-def set_alarm_on_off():
-    _, timeout = adjust_simple_setting("alarm_on", 0, 1, fn_display_true_false)
+async def set_alarm_on_off():
+    _, timeout = await adjust_simple_setting("alarm_on", 0, 1, fn_display_true_false)
     
     if (timeout):
         return("Time")
@@ -171,8 +177,8 @@ def set_alarm_on_off():
         return("Set Alarm Hour")
         
 
-def set_alarm_hour():
-    _, timeout = adjust_simple_setting("alarm_hour", 0, 23, fn_display_hour)
+async def set_alarm_hour():
+    _, timeout = await adjust_simple_setting("alarm_hour", 0, 23, fn_display_hour)
     
     if (timeout):
         return("Time")
@@ -180,8 +186,56 @@ def set_alarm_hour():
         return("Set Alarm Min")
         
         
-def set_alarm_min():
-    _, timeout = adjust_simple_setting("alarm_min", 0, 59, fn_display_min)
+async def set_alarm_min():
+    _, timeout = await adjust_simple_setting("alarm_min", 0, 59, fn_display_min)
+    
+    if (timeout):
+        return("Time")
+    else:
+        return("Alarm Days")
+        
+
+async def set_alarm_days():
+    _, timeout = await adjust_simple_setting("alarm_days", 0, len(alarms.DAY_MASKS)-1, fn_display_days)
+    
+    if (timeout):
+        return("Time")
+    else:
+        return("Alarm 2 On/ Off")
+        
+
+# The second alarm's time and days are skipped while it is off
+async def set_alarm2_on_off():
+    value, timeout = await adjust_simple_setting("alarm2_on", 0, 1, fn_display_true_false)
+    
+    if (timeout):
+        return("Time")
+    elif value:
+        return("Set Alarm 2 Hour")
+    else:
+        return("Set Hour")
+        
+
+async def set_alarm2_hour():
+    _, timeout = await adjust_simple_setting("alarm2_hour", 0, 23, fn_display_hour)
+    
+    if (timeout):
+        return("Time")
+    else:
+        return("Set Alarm 2 Min")
+        
+        
+async def set_alarm2_min():
+    _, timeout = await adjust_simple_setting("alarm2_min", 0, 59, fn_display_min)
+    
+    if (timeout):
+        return("Time")
+    else:
+        return("Alarm 2 Days")
+        
+
+async def set_alarm2_days():
+    _, timeout = await adjust_simple_setting("alarm2_days", 0, len(alarms.DAY_MASKS)-1, fn_display_days)
     
     if (timeout):
         return("Time")
@@ -189,9 +243,9 @@ def set_alarm_min():
         return("Set Hour")
         
         
-def set_hour():
+async def set_hour():
     hour,_,_ = RTC.Read_Time()
-    new_value, timeout = set(hour, 0, 23, fn_display_hour)
+    new_value, timeout = await set(hour, 0, 23, fn_display_hour)
     RTC.Set_Time_Hour(new_value)
     
     if (timeout):
@@ -200,9 +254,9 @@ def set_hour():
         return("Set Min")
         
         
-def set_minute():
+async def set_minute():
     _,minute,_ = RTC.Read_Time()
-    new_value, timeout = set(minute, 0, 59, fn_display_min)
+    new_value, timeout = await set(minute, 0, 59, fn_display_min)
     RTC.Set_Time_Min(new_value)
     
     if (timeout):
@@ -211,20 +265,33 @@ def set_minute():
         return("Set Second")
 
         
-def set_second():
+async def set_second():
     _,_,second = RTC.Read_Time()
     old_value = second
-    new_value, timeout = set(second, 0, 59, fn_display_sec)
+    new_value, timeout = await set(second, 0, 59, fn_display_sec)
     if new_value != old_value:
         RTC.Set_Time_Sec(new_value)
     
+    if (timeout):
+        return("Time")
+    else:
+        return("Set Day")
+
+
+# The day of the week, which the alarms' days are matched against
+async def set_day():
+    day = RTC.Read_Day()
+    new_value, timeout = await set(day or 7, 1, 7, fn_display_weekday)   # 0 if never set
+    if new_value != day:
+        RTC.Set_Day(new_value)
+    
     if (timeout):
         return("Time")
     else:
         return("Set Font")
         
-def set_font():
-    _, timeout = adjust_simple_setting("font", 1, 9, fn_display_font)
+async def set_font():
+    _, timeout = await adjust_simple_setting("font", 1, 9, fn_display_font)
     
     if (timeout):
         return("Time")
@@ -232,8 +299,8 @@ def set_font():
         return("Set Light Level")
 
 
-def set_brightness():    
-    _, timeout = adjust_simple_setting("brightness", 1, 10, fn_display_brightness)
+async def set_brightness():    
+    _, timeout = await adjust_simple_setting("brightness", 1, 10, fn_display_brightness)
     
     if (timeout):
         return("Time")
@@ -241,9 +308,9 @@ def set_brightness():
         return("Set RGB Mode")
 
 
-def set_rgb_mode():
+async def set_rgb_mode():
     
-    _, timeout = adjust_simple_setting("rgb_mode", 0, 10, fn_display_rgb_mode)
+    _, timeout = await adjust_simple_setting("rgb_mode", 0, leds.NUM_PATTERNS-1, fn_display_rgb_mode)
 
     if (timeout):
         return("Time")
@@ -251,8 +318,8 @@ def set_rgb_mode():
         return("Set 12/24 Hours")
 
 
-def set_12_24():
-    _, timeout = adjust_simple_setting("24_hour", 0, 1, fn_display_12_24)
+async def set_12_24():
+    _, timeout = await adjust_simple_setting("24_hour", 0, 1, fn_display_12_24)
     
     if (timeout):
         return("Time")
@@ -260,16 +327,16 @@ def set_12_24():
         return("Show Secs")
 
 
-def set_show_seconds():
-    _, timeout = adjust_simple_setting("show_secs", 0, 1, fn_display_true_false)
+async def set_show_seconds():
+    _, timeout = await adjust_simple_setting("show_secs", 0, 1, fn_display_true_false)
     if (timeout):
         return("Time")
     else:
         return("Adjust Timing")
 
 
-def set_adjust_timing():
-    adjust_simple_setting("adjust_timing", 0, 255, fn_display_adjust_timing)
+async def set_adjust_timing():
+    await adjust_simple_setting("adjust_timing", 0, 255, fn_display_adjust_timing)
     return("Time")
 
 
@@ -282,70 +349,165 @@ def set_adjust_timing():
 #====================================================================
 #====================================================================
 
-def show_digit_if_changed(num, pos):
+# The digit is animated from the previous one by the transition chosen in settings.py.
+# While a picture is being sent by DMA the other tasks run, and the shared frame
+# buffer isn't drawn into until it has been sent
+async def show_digit_if_changed(num, pos):
     global previous_digits
     
+    if num is not None:
+        num = int(num)
+        
     if num != previous_digits[pos]:
         
+        await LCD.wait_sent_async()
         LCD.select_digit(pos)
 
         if num is None:
             LCD.fill(LCD.black)
-            previous_digits[pos] = None
         else:
-            x = int(num)
-            LCD.display_digit(x)
-            previous_digits[pos] = x
+            await transitions.change_digit(LCD, previous_digits[pos], num)
+        previous_digits[pos] = num
         
-        LCD.show()            
+        await LCD.show_async()
 
     
 # 4-digit mode : display hours, minutes and flashing colon
-def show_time_4_digits(hr, min, sec):
+# Yields to the other tasks after each LCD is updated
+async def show_time_4_digits(hr, min, sec):
 
     # Show minute and alarm on/off and alarm time once a minute
     x = int(min%10)
     
     if (x != previous_digits[4]):
+        await LCD.wait_sent_async()
         LCD.select_digit(5)
-        if bool(settings.get_setting("alarm_on")):            
-            LCD.display_text("Alarm ON  {0}:{1:02d}".
-                format(settings.get_setting("alarm_hour"),
-                       settings.get_setting("alarm_min")))
+        alarm = alarms.next_alarm()
+        if alarm is not None:
+            LCD.display_text("Alarm ON  {0}:{1:02d}".format(alarm[0], alarm[1]))
         else:
             LCD.display_text("Alarm OFF")
         
-        LCD.select_digit(4)
-        previous_digits[4] = x
-        LCD.display_digit(x)
+        await asyncio.sleep_ms(0)
+        await show_digit_if_changed(x, 4)
+        await asyncio.sleep_ms(0)
         
     # Show tens of minute
-    show_digit_if_changed(min/10, 3)
+    await show_digit_if_changed(min/10, 3)
+    await asyncio.sleep_ms(0)
 
     # show blinking colon
+    await LCD.wait_sent_async()
     LCD.show_colon(2, sec%2)
+    await asyncio.sleep_ms(0)
 
     # show hour. Suppress leading zero if in 12 hour mode
-    show_digit_if_changed(hr%10, 1)
+    await show_digit_if_changed(hr%10, 1)
+    await asyncio.sleep_ms(0)
     
-    if (settings.get_setting("24_hour")==1) or (hr>9):
-        show_digit_if_changed(hr/10, 0)
+    if (settings.current.hour_24==1) or (hr>9):
+        await show_digit_if_changed(hr/10, 0)
     else:
-        show_digit_if_changed(None, 0)
+        await show_digit_if_changed(None, 0)
 
-    LCD.show()
+    await LCD.show_async()
 
         
         
-# 4-digit mode : display hours, minutes and seconds
-def show_time_6_digits(hr, mins, sec):
+# 6-digit mode : display hours, minutes and seconds
+# Yields to the other tasks after each LCD is updated
+async def show_time_6_digits(hr, mins, sec):
 
-    show_digit_if_changed(sec%10, 5)
-    show_digit_if_changed(sec/10, 4)
-    show_digit_if_changed(mins%10, 3)
-    show_digit_if_changed(mins/10, 2)
-    show_digit_if_changed(hr%10, 1)
-    show_digit_if_changed(hr/10, 0)
+    await show_digit_if_changed(sec%10, 5)
+    await asyncio.sleep_ms(0)
+    await show_digit_if_changed(sec/10, 4)
+    await asyncio.sleep_ms(0)
+    await show_digit_if_changed(mins%10, 3)
+    await asyncio.sleep_ms(0)
+    await show_digit_if_changed(mins/10, 2)
+    await asyncio.sleep_ms(0)
+    await show_digit_if_changed(hr%10, 1)
+    await asyncio.sleep_ms(0)
+    await show_digit_if_changed(hr/10, 0)
+
+
+
+#=======================================================================
+#=======================================================================
+#=======================================================================
+# Sounds the buzzer and flashes the LEDs until the task is cancelled
+#=======================================================================
+#=======================================================================
+#=======================================================================
+async def sound_alarm():
+    try:
+        while True:
+            for pattern in (leds.ALARM_PATTERN, 0):
+                leds.set_rgb_pattern(pattern)
+                
+                buzzer.duty_u16(32768)
+                for i in range(0,4):
+                    buzzer.freq(1500)
+                    await asyncio.sleep_ms(50)
+                    buzzer.freq(2400)
+                    await asyncio.sleep_ms(50)
+                buzzer.duty_u16(0)
+                
+                await asyncio.sleep_ms(600)
+    finally:
+        buzzer.duty_u16(0)
+        leds.set_rgb_pattern(settings.current.rgb_mode)
+
+
+
+#=======================================================================
+#=======================================================================
+#=======================================================================
+# Low power 4-digit mode, see settings.LOW_POWER. The DS3231's INT pin
+# is switched from the 1Hz square wave to its alarm interrupt, set to
+# fall once a minute, so the time is read only when the minutes change.
+# The colon is blinked on the RP2040's timer in between
+#=======================================================================
+#=======================================================================
+#=======================================================================
+colon_visible = 0
+next_blink = 0
+
+def start_low_power():
+    # The INT pin falls when the alarm goes off, then rises as it is cleared
+    rtc_1Hz_pin.irq(trigger=Pin.IRQ_FALLING, handler=rtc_1hz_interrupt)
+    RTC.Set_Minute_Interrupt(True)
+
+
+def stop_low_power():
+    RTC.Set_Minute_Interrupt(False)
+    rtc_1Hz_pin.irq(trigger=Pin.IRQ_RISING, handler=rtc_1hz_interrupt)
+
+
+# Blink the colon once a second, from a tick at `sec` seconds
+def start_blink(sec):
+    global colon_visible, next_blink
+    colon_visible = sec % 2
+    next_blink = time.ticks_add(time.ticks_ms(), 1000)
+
+
+# Wait for the next event, blinking the colon meanwhile. If `sleep` is True
+# the CPU stays in lightsleep between blinks, and the other tasks don't run
+async def wait_blinking(sleep):
+    global colon_visible, next_blink
+    
+    while True:
+        timeout = max(time.ticks_diff(next_blink, time.ticks_ms()), 0)
+        if sleep:
+            event = events.wait(timeout, True)
+        else:
+            event = await events.wait_async(timeout)
+        if event is not None:
+            return event
+        
+        colon_visible = 1 - colon_visible
+        LCD.show_colon(2, colon_visible)
+        next_blink = time.ticks_add(next_blink, 1000)
 
 
 
@@ -356,48 +518,53 @@ def show_time_6_digits(hr, mins, sec):
 #=======================================================================
 #=======================================================================
 #=======================================================================
-def show_time():
-    global tick
+async def show_time():
     global previous_digits
     
-    sound_alarm = False    
-    tick = True
     previous_digits = [None,None,None,None,None,None]
     
+    # The time may have been changed in the settings menu
+    alarms.restart()
+    
+    low_power = settings.LOW_POWER and not settings.current.show_secs
+    if low_power:
+        start_low_power()
+    
+    try:
+        return await show_time_until_mode(low_power)
+    finally:
+        if low_power:
+            stop_low_power()
+
+
+async def show_time_until_mode(low_power):
+    alarm_task = None
+    
+    # Start with a tick so the time is displayed straight away
+    events.clear()
+    event = events.TICK
+    
     while True:
         
-        if tick:  # wait for the next 1 second tick
+        if event == events.TICK:  # the next 1 second tick, or 1 minute in low power mode
+            
+            _,_,_,day,hr24,min,sec = RTC.read_datetime()
+            transitions.start_tick()
+            settings.flush_if_idle()
             
-            tick = False
-            hr24,min,sec = RTC.Read_Time()
+            if low_power:
+                RTC.Clear_Alarm_Flags()
+                start_blink(sec)
 
             # Check if it's time to sound the alarm.
-            if (sec == 0) and \
-               (settings.get_setting("alarm_on") == 1) and \
-               (settings.get_setting("alarm_hour") == hr24) and \
-               (settings.get_setting("alarm_min") == min):                    
+            if alarms.check(day, hr24, min, sec) and (alarm_task is None):
                 print("WAKEY WAKEY!")
-                sound_alarm = True
-                                
-            if sound_alarm:
-                if (sec % 2) == 0:
-                    leds.rgb_strip.fill((255,255,255))
-                else:
-                    leds.rgb_strip.fill((0,0,0))
-                leds.rgb_strip.write()
-                
-                buzzer.duty_u16(32768)
-                for i in range(0,4):
-                    buzzer.freq(1500)
-                    time.sleep(0.05)
-                    buzzer.freq(2400)
-                    time.sleep(0.05)
-                buzzer.duty_u16(0)
+                alarm_task = asyncio.create_task(sound_alarm())
                     
             # Display the current time
             hr = hr24
                 
-            if settings.get_setting("24_hour"):
+            if settings.current.hour_24:
                 # 24 hour clock. Show time as 0-23
                 hr = hr24
             else:
@@ -406,31 +573,32 @@ def show_time():
                 if (hr == 0):                
                     hr = 12
 
-            if settings.get_setting("show_secs") == 1:            
-                show_time_6_digits(hr,min,sec)
+            if settings.current.show_secs == 1:
+                await show_time_6_digits(hr,min,sec)
             else:
-                show_time_4_digits(hr,min,sec)
-
-            
-        # Here would be a good place to animate the LEDs etc
-        
-        if sound_alarm:            
-            if get_button() is not None:
-                
-                # Stop the alarm
-                sound_alarm = False
-                buzzer.duty_u16(0)
-                leds.set_rgb_pattern(settings.get_setting("rgb_mode"))
-                
-                # Wait for button release
-                while True:
-                    time.sleep(0.2)
-                    if get_button() is None:
-                        break
+                await show_time_4_digits(hr,min,sec)
+
+        elif alarm_task is not None:
+            # The mode button stops the alarm. The others snooze it
+            alarm_task.cancel()
+            alarm_task = None
+            if event == events.MODE:
+                alarms.stop()
+            else:
+                alarms.snooze()
                     
+        elif event == events.MODE:
+            return("Alarm On/ Off")
+            
+        # Wait for the next tick or button press. In low power mode the CPU
+        # sleeps, unless the alarm is sounding or the LEDs are animated
+        if low_power:
+            event = await wait_blinking((alarm_task is None) and
+                                        (settings.LED_CORE1 or
+                                         leds.rgb_mode not in leds.ANIMATED_PATTERNS))
         else:
-            if get_button() == "M":
-                return("Alarm On/ Off")
+            # Let the other tasks run meanwhile
+            event = await events.wait_async()
                 
 
 
@@ -443,7 +611,7 @@ def show_time():
 #=======================================================================
 
 settings.load_settings()
-leds.set_rgb_pattern(settings.get_setting("rgb_mode"))
+leds.set_rgb_pattern(settings.current.rgb_mode)
 
 btn_mode_pin  = Pin(settings.MODE_PIN, Pin.IN)
 btn_left_pin  = Pin(settings.LEFT_PIN, Pin.IN)
@@ -451,10 +619,13 @@ btn_right_pin = Pin(settings.RIGHT_PIN, Pin.IN)
 rtc_1Hz_pin   = Pin(settings.RTC_1HZ_PIN, Pin.IN)
 
 LCD = display.Display()
-LCD.set_font(settings.get_setting("font"))
+LCD.set_brightness(settings.current.brightness)
 
 RTC = ds3231.DS3231(add = 0x68)
-RTC.Set_Timing(settings.get_setting("adjust_timing"))
+RTC.Set_Timing(settings.current.adjust_timing)
+settings.on_change("adjust_timing", RTC.Set_Timing)
+
+alarms.start()
 
 buzzer = PWM(Pin(settings.BUZZER_PIN, Pin.OUT))
 buzzer.duty_u16(0)
@@ -462,64 +633,100 @@ buzzer.duty_u16(0)
 # Set up the handler to recieve a regular interrupt on the 1Hz output from the DS3231
 rtc_1Hz_pin.irq(trigger=Pin.IRQ_RISING, handler=rtc_1hz_interrupt)
 
+# The buttons also post events to the queue when pressed. Up and Down repeat while held
+events.attach_button(btn_mode_pin, events.MODE)
+events.attach_button(btn_left_pin, events.LEFT, True)
+events.attach_button(btn_right_pin, events.RIGHT, True)
+
 
 #===================================================================
-# The main control loop starts here
+# The main control loop starts here. It runs as one asyncio task,
+# alongside the LED animation task, unless the LEDs are animated by
+# the second core
 #===================================================================
-mode = "Time"
-tick = True
-
+async def main():
+    # mode is global, as fn_display_font() shows it on the first LCD
+    global mode
+    
+    if settings.LED_CORE1:
+        leds.start_core1()
+    else:
+        asyncio.create_task(leds.animate())
+    mode = "Time"
 
-while True:
-    LCD.set_brightness(settings.get_setting("brightness"))
-    LCD.clear()
+    while True:
+        LCD.clear()
 
 
-    if (mode == "Time"):
-        mode = show_time()
-    else:
-        LCD.select_digit(0)
-        LCD.display_text(mode)
+        if (mode == "Time"):
+            # Back from the settings menu. Write any settings changed in it to flash
+            settings.flush()
+            mode = await show_time()
+        else:
+            LCD.select_digit(0)
+            LCD.display_text(mode)
 
-        if mode == "Alarm On/ Off":
-            mode = set_alarm_on_off()
+            if mode == "Alarm On/ Off":
+                mode = await set_alarm_on_off()
             
-        elif mode == "Set Alarm Hour":
-            mode = set_alarm_hour()
+            elif mode == "Set Alarm Hour":
+                mode = await set_alarm_hour()
             
-        elif mode == "Set Alarm Min":
-            mode = set_alarm_min()
+            elif mode == "Set Alarm Min":
+                mode = await set_alarm_min()
             
-        elif mode == "Set Hour":
-            mode = set_hour()
+            elif mode == "Alarm Days":
+                mode = await set_alarm_days()
             
-        elif mode == "Set Min":
-            mode = set_minute()
+            elif mode == "Alarm 2 On/ Off":
+                mode = await set_alarm2_on_off()
             
-        elif mode == "Set Second":
-            mode = set_second()
+            elif mode == "Set Alarm 2 Hour":
+                mode = await set_alarm2_hour()
             
-        elif mode == "Set Font":
-            mode = set_font()
+            elif mode == "Set Alarm 2 Min":
+                mode = await set_alarm2_min()
             
-        elif mode == "Set Light Level":
-            mode = set_brightness()
+            elif mode == "Alarm 2 Days":
+                mode = await set_alarm2_days()
             
-        elif mode == "Set RGB Mode":
-            mode = set_rgb_mode()
+            elif mode == "Set Hour":
+                mode = await set_hour()
             
-        elif mode == "Set 12/24 Hours":
-            mode = set_12_24()
+            elif mode == "Set Min":
+                mode = await set_minute()
             
-        elif mode == "Show Secs":
-            mode = set_show_seconds()
+            elif mode == "Set Second":
+                mode = await set_second()
             
-        elif mode == "Adjust Timing":
-            mode = set_adjust_timing()
+            elif mode == "Set Day":
+                mode = await set_day()
             
-        else:
-            print("Unexpected mode :",mode)
-            mode = "Time"
+            elif mode == "Set Font":
+                mode = await set_font()
+            
+            elif mode == "Set Light Level":
+                mode = await set_brightness()
+            
+            elif mode == "Set RGB Mode":
+                mode = await set_rgb_mode()
+            
+            elif mode == "Set 12/24 Hours":
+                mode = await set_12_24()
+            
+            elif mode == "Show Secs":
+                mode = await set_show_seconds()
+            
+            elif mode == "Adjust Timing":
+                mode = await set_adjust_timing()
+            
+            else:
+                print("Unexpected mode :",mode)
+                mode = "Time"
     
     
+# Only start the clock when run, not when imported by benchmark.py
+if __name__ == "__main__":
+    asyncio.run(main())
+
 # The end.
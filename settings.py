@@ -7,6 +7,7 @@
 #=============================================================
 
 import json
+import time
 
 # GPIO Pin Numbers for LCD
 RST_PIN    = 12
@@ -28,6 +29,76 @@ BUZZER_PIN = 14
 NEOPIXEL_PIN = 22
 RTC_1HZ_PIN = 18
 
+# RAM budget in bytes for caching Nixie digit images. Each .raw image uses
+# 64,800 bytes, so the Pico has room for only a few, and with the digits changing
+# in turn they are rarely reused. Images are only cached if the budget holds at
+# least two of them. 0 disables the cache.
+GLYPH_CACHE_BYTES = 0
+
+# RAM budget in bytes for the Dots and 7 segment digits, which use 4,050 bytes each.
+# The Nixie image cache is emptied while these are in use. 0 disables the cache.
+DIGIT_CACHE_BYTES = 40500
+
+# Send the Nixie digits straight from their .raw files to the LCDs, rather than
+# through the frame buffer and the image cache. Saves the RAM and copying, but
+# reads the file every time. Not used with the .rle files
+NIXIE_STREAM = False
+
+# Animation when a digit of the time changes: "none", "crossfade", "slide" or
+# "flicker". The Nixie digits slide rather than crossfade
+TRANSITION = "none"
+
+# Length of each transition and the most frames it is drawn with. Frames which
+# can't be drawn in time are skipped
+TRANSITION_MS = 250
+TRANSITION_FRAMES = 8
+
+# All the transitions in one second must finish within this time, so the next
+# second is never held up. Digits changing once it is used up just change
+TRANSITION_BUDGET_MS = 600
+
+# While waiting for the next event, put the CPU into lightsleep rather than
+# just idling. Saves more power, but may upset the USB connection to Thonny
+LIGHT_SLEEP = False
+
+# Animate the RGB LEDs on the RP2040's second core, rather than as an asyncio task
+LED_CORE1 = False
+
+# How the LCDs are driven: "spi" for the RP2040's hardware SPI at 25MHz, or "pio"
+# for a PIO state machine, which also drives the chip select and DC pins itself
+LCD_BACKEND = "spi"
+
+# PIO state machine frequency. The LCD clock runs at half of this, 31.25MHz at
+# 62.5MHz. Up to 125MHz may work, if the LCDs can keep up
+LCD_PIO_FREQ = 62_500_000
+
+# Send pictures to the LCDs by DMA, so the CPU is free while they are sent.
+# Needs a MicroPython with rp2.DMA (v1.21 or later). Only for the "spi" backend
+SPI_DMA = False
+
+# With SPI_DMA, copy each picture into a second 64,800 byte buffer and send it
+# from there, so show() returns straight away and the next picture can be drawn
+# while the last one is still being sent
+SPI_DOUBLE_BUFFER = False
+
+# How the settings are kept on flash: "json" rewrites settings.json each time,
+# "binary" appends just the changed values to settings.bin, which is smaller
+# and quicker to write. Writing to flash stalls both cores, and wears it
+SETTINGS_FORMAT = "json"
+
+# Changed settings are written to flash on leaving the settings menu, or this
+# long after the last change, whichever comes first
+SETTINGS_FLUSH_MS = 10000
+
+# Minutes the alarm is put off for by pressing the left or right button while
+# it sounds. The mode button stops it
+SNOOZE_MINUTES = 9
+
+# In 4-digit mode, have the DS3231 interrupt once a minute rather than every
+# second, and keep the CPU in lightsleep in between, woken by its timer just to
+# blink the colon. Like LIGHT_SLEEP, may upset the USB connection to Thonny
+LOW_POWER = False
+
 
 # Global Variables
 settings = {
@@ -39,11 +110,61 @@ settings = {
     "rgb_mode": 1,
     "24_hour" : 1,
     "show_secs" : 1,
-    "adjust_timing" : 128
+    "adjust_timing" : 128,
+    "alarm_days": 0,
+    "alarm2_on": 0,
+    "alarm2_hour": 8,
+    "alarm2_min": 0,
+    "alarm2_days": 0
 }
 
 tick = True
 
+# The settings in the order they are numbered in settings.bin. New settings
+# must be added at the end
+KEYS = ("alarm_hour", "alarm_min", "alarm_on", "font", "brightness",
+        "rgb_mode", "24_hour", "show_secs", "adjust_timing",
+        "alarm_days", "alarm2_on", "alarm2_hour", "alarm2_min", "alarm2_days")
+
+changed = set()     # settings changed since they were last written to flash
+changed_time = 0    # ticks_ms() of the last change
+writes = 0          # number of times the settings have been written to flash
+log_records = 0     # number of values in settings.bin
+
+
+#==============================================================================
+# The setting values as integer attributes, for code that reads them often,
+# e.g. every second: settings.current.alarm_on rather than
+# get_setting("alarm_on"). Updated whenever a setting is loaded or saved.
+# "24_hour" isn't a valid attribute name, so is hour_24
+#==============================================================================
+class Snapshot:
+    
+    __slots__ = ("alarm_hour", "alarm_min", "alarm_on", "font", "brightness",
+                 "rgb_mode", "hour_24", "show_secs", "adjust_timing",
+                 "alarm_days", "alarm2_on", "alarm2_hour", "alarm2_min", "alarm2_days")
+    
+    def __init__(self):
+        self.refresh()
+    
+    # Update the attributes from the settings dictionary, or just the one for key
+    def refresh(self, key=None):
+        for k in KEYS if key is None else (key,):
+            setattr(self, "hour_24" if k == "24_hour" else k, int(settings[k]))
+
+
+current = Snapshot()
+
+# Functions called with the new value when a setting is changed, by key
+callbacks = {}
+
+
+# Call callback(value) whenever the setting key is changed by save_setting()
+def on_change(key, callback):
+    if key not in callbacks:
+        callbacks[key] = []
+    callbacks[key].append(callback)
+
 
 #==============================================================================
 #==============================================================================
@@ -53,23 +174,101 @@ tick = True
 #==============================================================================
 #==============================================================================
 
+# settings.bin holds 3 byte records: the setting's number in KEYS, then its
+# value as a 16 bit big-endian number. Changed values are appended, and the
+# last record for each setting is the one used. When it gets long, the file is
+# rewritten with just one record for each
+LOG_FILE = "settings.bin"
+LOG_MAX_RECORDS = 100
+
+
 # Save all settings to "disk".
 def save_settings():
-    with open("settings.json", "w") as f:
-        json.dump(settings, f)
+    global writes, log_records
+    
+    if SETTINGS_FORMAT == "binary":
+        records = bytearray()
+        for i in range(len(KEYS)):
+            if KEYS[i] in settings:
+                value = int(settings[KEYS[i]]) & 0xFFFF
+                records.extend(bytes((i, value >> 8, value & 0xFF)))
+        with open(LOG_FILE, "wb") as f:
+            f.write(records)
+        log_records = len(records) // 3
+    else:
+        with open("settings.json", "w") as f:
+            json.dump(settings, f)
+            
+    changed.clear()
+    writes = writes + 1
+
+
+# Append the changed settings to settings.bin, or rewrite it if it would get too long
+def append_settings():
+    global writes, log_records
+    
+    if log_records + len(changed) > LOG_MAX_RECORDS:
+        save_settings()
+        return
+        
+    records = bytearray()
+    for key in changed:
+        value = int(settings[key]) & 0xFFFF
+        records.extend(bytes((KEYS.index(key), value >> 8, value & 0xFF)))
+    with open(LOG_FILE, "ab") as f:
+        f.write(records)
+    log_records = log_records + len(changed)
+    
+    changed.clear()
+    writes = writes + 1
  
  
-# Load all settings from "disk"
+# Load all settings from "disk". Settings missing from the file keep their
+# default values. A settings.json from before the binary format is read if
+# there is no settings.bin
 def load_settings():
-    global settings
+    global log_records
+    
+    if SETTINGS_FORMAT == "binary":
+        try:
+            with open(LOG_FILE, "rb") as f:
+                records = f.read()
+            log_records = len(records) // 3
+            for i in range(0, log_records * 3, 3):
+                if records[i] < len(KEYS):
+                    settings[KEYS[records[i]]] = (records[i+1] << 8) | records[i+2]
+            current.refresh()
+            return
+        except OSError:
+            pass
+    
     try:
         with open("settings.json", "r") as f:
-            settings = json.load(f)
+            settings.update(json.load(f))
+        current.refresh()
+        if SETTINGS_FORMAT == "binary":
+            save_settings()
     except:
         print("Unable to load settings.json . Creating new file")
         save_settings()
 
 
+# Write any changed settings to flash
+def flush():
+    if changed:
+        if SETTINGS_FORMAT == "binary":
+            append_settings()
+        else:
+            save_settings()
+
+
+# Write any changed settings to flash once SETTINGS_FLUSH_MS has passed
+# since the last change. Called regularly, e.g. every second
+def flush_if_idle():
+    if changed and (time.ticks_diff(time.ticks_ms(), changed_time) >= SETTINGS_FLUSH_MS):
+        flush()
+
+
 # Retrieve a single setting value from memory
 def get_setting(key):
     if key in settings:
@@ -78,11 +277,19 @@ def get_setting(key):
         raise Exception("Key '" + key + "' not found in settings. Delete file settings.json and try again")
 
 
-# Update a single setting value in memory and "disk"
+# Update a single setting value in memory. It is written to "disk" later,
+# by flush(), and only if it has changed. Anything registered with on_change()
+# is told about the new value
 def save_setting(key,value):
+    global changed_time
     if key in settings:
-        settings[key] = value
-        save_settings()
+        if settings[key] != value:
+            settings[key] = value
+            changed.add(key)
+            changed_time = time.ticks_ms()
+            current.refresh(key)
+            for callback in callbacks.get(key, ()):
+                callback(int(value))
     else:
         raise Exception("Key '" + key + "' not found in settings. Delete file settings.json and try again")
 
@@ -0,0 +1,31 @@
+#=============================================================
+# Tests run on the PC with pytest:  python -m pytest tests
+#
+# The firmware's modules are imported from the directory above,
+# with the MicroPython-only modules supplied by the emulator.
+#=============================================================
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+import pytest
+
+
+# main.py, imported with a scratch directory standing in for the Pico's flash,
+# so settings.json isn't written into the repository
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    import emulator
+    emulator.install()
+
+    cwd = os.getcwd()
+    os.chdir(str(tmp_path_factory.mktemp("flash")))
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
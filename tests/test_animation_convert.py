@@ -0,0 +1,97 @@
+#=============================================================
+# fonts/animation_convert.py must turn the shipped .png images
+# into exactly the shipped .raw files, and its .rle files must
+# expand back into the same pictures with the firmware's
+# Display.decode_rle().
+#=============================================================
+
+import importlib.util
+import os
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+png = pytest.importorskip("png")
+
+from conftest import ROOT
+
+import emulator
+
+emulator.install()
+
+import display
+
+FONTS = os.path.join(ROOT, "fonts")
+
+spec = importlib.util.spec_from_file_location("animation_convert", os.path.join(FONTS, "animation_convert.py"))
+animation_convert = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(animation_convert)
+
+
+# The firmware's decoder, expanding into the frame buffer of an emulated display
+LCD = display.Display()
+
+
+def decode_rle(data):
+    LCD.buffer[:] = b"\xA5" * len(LCD.buffer)
+    LCD.decode_rle(data)
+    return bytes(LCD.buffer)
+
+
+def rle_header(width, height):
+    return b"R565" + bytes((width >> 8, width & 0xFF, height >> 8, height & 0xFF))
+
+
+@pytest.mark.parametrize("digit", range(10))
+def test_shipped_images_convert_to_the_shipped_raw_files(tmp_path, digit):
+    infile = os.path.join(FONTS, "{0}.png".format(digit))
+    animation_convert.convert_file(infile, str(tmp_path))
+
+    with open(os.path.join(FONTS, "{0}.raw".format(digit)), "rb") as f:
+        expected = f.read()
+    assert (tmp_path / "{0}.raw".format(digit)).read_bytes() == expected
+    assert decode_rle((tmp_path / "{0}.rle".format(digit)).read_bytes()) == expected
+
+
+def test_alpha_channel_is_dropped(tmp_path):
+    infile = str(tmp_path / "a.png")
+    with open(infile, "wb") as f:
+        png.Writer(width=2, height=1, greyscale=False, alpha=True).write(
+            f, [[255, 0, 0, 0, 0x12, 0x34, 0x56, 255]])
+
+    animation_convert.convert_file(infile, str(tmp_path), rle=False)
+    assert (tmp_path / "a.raw").read_bytes() == bytes((0xF8, 0x00, 0x11, 0xAA))
+
+
+def test_rotate_turns_upright_images_anticlockwise(tmp_path):
+    infile = str(tmp_path / "r.png")
+    with open(infile, "wb") as f:
+        png.Writer(width=1, height=2, greyscale=False).write(f, [[255, 255, 255], [0, 0, 0]])
+
+    animation_convert.convert_file(infile, str(tmp_path), rotate=True, rle=False)
+    assert (tmp_path / "r.raw").read_bytes() == bytes((0xFF, 0xFF, 0x00, 0x00))
+
+
+def test_decode_rle_repeats_pixels_n_minus_126_times():
+    # One literal pixel, 251 runs of 129 pixels and a run of 20
+    pixels = LCD.width * LCD.height
+    data = rle_header(LCD.width, LCD.height) + bytes((0, 0x12, 0x34))
+    data += bytes((255, 0xAB, 0xCD)) * 251 + bytes((20 + 126, 0x01, 0x02))
+    assert 1 + 251 * 129 + 20 == pixels
+
+    expected = b"\x12\x34" + b"\xAB\xCD" * (251 * 129) + b"\x01\x02" * 20
+    assert decode_rle(data) == expected
+
+
+def test_encoded_runs_and_literals_decode_to_the_picture():
+    # Runs either side of the longest repeat and literal, then noise
+    pixels = LCD.width * LCD.height
+    runs = [(2, 1), (3, 2), (129, 3), (130, 4), (400, 5)]
+    raw = bytearray()
+    for length, value in runs:
+        raw += bytes((0, value)) * length
+    raw += bytes(range(256)) * ((pixels * 2 - len(raw)) // 256 + 1)
+    raw = bytes(raw[:pixels * 2])
+
+    encoded = animation_convert.rle_encode(raw, LCD.width, LCD.height)
+    assert decode_rle(bytes(encoded)) == raw
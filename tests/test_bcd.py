@@ -0,0 +1,29 @@
+#=============================================================
+# The DS3231's BCD lookup tables, checked against the arithmetic
+# they replaced. benchmark.py times the two.
+#=============================================================
+
+import emulator
+
+emulator.install()
+
+import ds3231
+
+
+# The conversions as they were before the tables
+def old_bcd_to_dec(code):
+    return (((code & 0xf000) >> 12)) * 1000 + (((code & 0xf00) >> 8)) * 100 + \
+           (((code & 0xf0) >> 4)) * 10 + (code & 0x0f)
+
+
+def old_dec_to_bcd(code):
+    return int(code % 10 + ((int(code / 10) % 10) << 4) + ((int(code / 100) % 10) << 8) +
+               ((int(code / 1000) % 10) << 12))
+
+
+def test_tables_match_the_old_conversions():
+    for n in range(100):
+        assert ds3231.DEC_TO_BCD[n] == old_dec_to_bcd(n)
+    for b in range(256):
+        assert ds3231.BCD_TO_DEC[b] == old_bcd_to_dec(b)
+
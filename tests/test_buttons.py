@@ -0,0 +1,220 @@
+#=============================================================
+# Button events: debouncing, long presses and auto-repeat, and
+# the settings screens consuming them. The buttons are driven
+# through their pin interrupt and timer callbacks, with a fake
+# clock standing in for time.ticks_ms().
+#=============================================================
+
+import emulator
+
+emulator.install()
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+import pytest
+
+import events
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100000
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_add(self, ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(self, ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+class FakePin:
+
+    def __init__(self):
+        self.level = 0
+
+    def value(self):
+        return self.level
+
+    def irq(self, trigger=None, handler=None):
+        pass
+
+
+# Only records whether the button's poll is due, as the test calls it
+class FakeTimer:
+
+    def __init__(self):
+        self.armed = False
+
+    def init(self, mode=None, period=None, callback=None):
+        self.armed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(events, "time", clock)
+    return clock
+
+
+def drain():
+    found = []
+    event = events.get()
+    while event is not None:
+        found.append(event)
+        event = events.get()
+    return found
+
+
+def make_button(event, repeat):
+    events.clear()
+    pin = FakePin()
+    button = events.Button(pin, event, repeat)
+    button.timer = FakeTimer()
+    return button
+
+
+# Runs the button's timer for ms milliseconds
+def run_for(clock, button, ms):
+    end = clock.now + ms
+    while clock.now < end:
+        clock.now += 1
+        if button.timer.armed and clock.now - button.polled >= events.POLL_MS:
+            button.timer.armed = False
+            button.poll(button.timer)
+
+
+def press(clock, button):
+    button.pin.level = 1
+    button.press(button.pin)
+
+
+def hold(clock, button, ms):
+    press(clock, button)
+    run_for(clock, button, ms)
+    button.pin.level = 0
+    run_for(clock, button, 4 * events.POLL_MS)
+
+
+def test_repeating_button_posts_repeats_but_no_long_press(clock):
+    button = make_button(events.LEFT, True)
+    press(clock, button)
+    assert drain() == [events.LEFT]
+
+    run_for(clock, button, events.REPEAT_DELAY_MS - events.POLL_MS)
+    assert drain() == []
+    run_for(clock, button, 800)
+    button.pin.level = 0
+    run_for(clock, button, 4 * events.POLL_MS)
+
+    found = drain()
+    assert len(found) > 3
+    assert all(e == events.LEFT | events.REPEAT for e in found)
+
+
+def test_repeats_get_faster(clock):
+    button = make_button(events.LEFT, True)
+    press(clock, button)
+    drain()
+    run_for(clock, button, events.REPEAT_DELAY_MS)
+    times = []
+    while button.interval > events.REPEAT_MIN_MS:
+        run_for(clock, button, 1)
+        if events.get() is not None:
+            times.append(clock.now)
+
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert gaps == sorted(gaps, reverse=True)
+    assert gaps[0] > gaps[-1]
+
+
+def test_short_press_is_posted_when_let_go(clock):
+    button = make_button(events.MODE, False)
+    press(clock, button)
+    run_for(clock, button, 300)
+    assert drain() == []
+
+    button.pin.level = 0
+    run_for(clock, button, events.POLL_MS)
+    assert drain() == [events.MODE]
+
+
+# A long press must not also act as a short one, e.g. moving on to the
+# next settings screen before going back to the time
+def test_long_press_posts_only_long(clock):
+    button = make_button(events.MODE, False)
+    press(clock, button)
+    run_for(clock, button, events.LONG_PRESS_MS - events.POLL_MS)
+    assert drain() == []
+    run_for(clock, button, events.POLL_MS)
+    assert drain() == [events.MODE | events.LONG]
+
+    run_for(clock, button, 1000)
+    button.pin.level = 0
+    run_for(clock, button, 4 * events.POLL_MS)
+    assert drain() == []
+
+
+def test_bouncing_press_is_posted_once(clock):
+    button = make_button(events.RIGHT, True)
+    for i in range(3):
+        press(clock, button)
+        clock.now += 1
+    run_for(clock, button, 100)
+    button.pin.level = 0
+    run_for(clock, button, events.POLL_MS)
+
+    # Bounces as it is let go
+    for i in range(2):
+        press(clock, button)
+        button.pin.level = 0
+        clock.now += 1
+    run_for(clock, button, 4 * events.POLL_MS)
+    assert drain() == [events.RIGHT]
+
+
+def test_no_lightsleep_while_a_button_is_held(clock, monkeypatch):
+    button = make_button(events.MODE, False)
+    monkeypatch.setattr(events, "buttons", [button])
+    sleeps = []
+
+    def lightsleep(ms):
+        sleeps.append("lightsleep")
+        clock.now += ms
+
+    def idle():
+        sleeps.append("idle")
+        clock.now += events.POLL_MS
+
+    monkeypatch.setattr(events.machine, "lightsleep", lightsleep)
+    monkeypatch.setattr(events.machine, "idle", idle)
+
+    press(clock, button)
+    assert events.wait(50, True) is None
+    assert set(sleeps) == {"idle"}
+
+    button.held = False
+    del sleeps[:]
+    assert events.wait(50, True) is None
+    assert sleeps == ["lightsleep"]
+
+
+# A press made while a settings screen is being drawn counts, and ticks are ignored
+def test_set_keeps_presses_made_before_it_starts(main):
+    events.clear()
+    for event in (events.LEFT, events.TICK, events.LEFT | events.REPEAT, events.MODE):
+        events.post(event)
+    assert asyncio.run(main.set(5, 0, 9, None)) == (7, False)
+
+
+def test_set_returns_on_long_mode_press(main):
+    events.clear()
+    for event in (events.RIGHT, events.MODE | events.LONG):
+        events.post(event)
+    assert asyncio.run(main.set(0, 0, 9, None)) == (9, True)
@@ -0,0 +1,104 @@
+#=============================================================
+# Display.show() sends only the dirty rectangle. The bytes sent
+# are counted by a fake SPI wrapped around the emulator's, and
+# the picture the emulated LCD ends up with is compared with the
+# frame buffer.
+#=============================================================
+
+import emulator
+
+board = emulator.install()
+
+import display
+
+# CASET and RASET with 4 parameter bytes each, then RAMWR
+WINDOW_BYTES = 5 + 5 + 1
+
+
+class FakeSPI:
+
+    def __init__(self, spi):
+        self.spi = spi
+        self.writes = []
+
+    def write(self, buf):
+        self.writes.append(len(buf))
+        self.spi.write(buf)
+
+    def sent(self):
+        total = sum(self.writes)
+        self.writes = []
+        return total
+
+
+LCD = display.Display()
+spi = FakeSPI(LCD.spi)
+LCD.spi = spi
+
+
+def panel():
+    return board.panels[LCD.selected_digit]
+
+
+def test_full_picture_is_sent_once():
+    LCD.select_digit(0)
+    LCD.fill(LCD.red)
+    spi.sent()
+    LCD.show()
+    assert spi.sent() == LCD.width * LCD.height * 2 + WINDOW_BYTES
+    assert bytes(panel().memory) == bytes(LCD.buffer)
+
+    # Nothing has changed since
+    LCD.show()
+    assert spi.sent() == 0
+
+
+def test_only_the_changed_rectangle_is_sent():
+    LCD.select_digit(1)
+    LCD.fill(LCD.black)
+    LCD.show()
+    spi.sent()
+
+    LCD.fill_rect(100, 40, 20, 10, LCD.white)
+    LCD.show()
+    assert spi.sent() == 20 * 10 * 2 + WINDOW_BYTES
+    assert bytes(panel().memory) == bytes(LCD.buffer)
+
+
+def test_dirty_rectangle_covers_all_changes():
+    LCD.select_digit(2)
+    LCD.fill(LCD.black)
+    LCD.show()
+    spi.sent()
+
+    LCD.pixel(10, 20, LCD.white)
+    LCD.pixel(29, 24, LCD.white)
+    LCD.show()
+    assert spi.sent() == 20 * 5 * 2 + WINDOW_BYTES
+    assert bytes(panel().memory) == bytes(LCD.buffer)
+
+
+def test_colon_blink_sends_just_the_dots():
+    LCD.clear()
+    LCD.show_colon(2, 1)
+    spi.sent()
+
+    LCD.show_colon(2, 0)
+    assert spi.sent() == 2 * (25 * 25 * 2 + WINDOW_BYTES)
+    LCD.show_colon(2, 0)
+    assert spi.sent() == 0
+
+
+def test_colon_clears_a_panel_showing_something_else():
+    for shown in (None, ("fill", LCD.white)):
+        LCD.select_digit(2)
+        LCD.fill(LCD.white)
+        LCD.show()
+        LCD.panel_content[2] = shown
+        spi.sent()
+
+        LCD.show_colon(2, 1)
+        assert spi.sent() == 240 * 135 * 2 + WINDOW_BYTES
+        assert bytes(panel().memory) == bytes(LCD.buffer)
+        assert LCD.pixel(0, 0) == LCD.black
+        assert LCD.pixel(80, 70) == LCD.fg_colour
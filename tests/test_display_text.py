@@ -0,0 +1,50 @@
+#=============================================================
+# The words shown on the settings screens must fit across one
+# LCD. A letter that runs off the edge loses some of its pixels,
+# so each word is drawn and its lit pixels are counted against
+# those of its letters' glyphs.
+#=============================================================
+
+import array
+
+import emulator
+
+emulator.install()
+
+import alarms
+import display
+
+LCD = display.Display()
+
+
+def lit_pixels():
+    return sum(1 for pixel in array.array("H", LCD.buffer) if pixel != LCD.black)
+
+
+def glyph_pixels(letter):
+    glyph = LCD.text_glyph(letter)
+    return sum(glyph.pixel(x, y) for x in range(display.FONT_HEIGHT * 4)
+                                 for y in range(display.FONT_WIDTH * 4))
+
+
+def check_fits(line):
+    LCD.display_text(line)
+    expected = sum(glyph_pixels(letter) for letter in line if letter != " ")
+    assert lit_pixels() == expected, line
+
+
+def test_weekday_names_fit():
+    assert len(alarms.WEEKDAY_NAMES) == 7
+    for name in alarms.WEEKDAY_NAMES:
+        check_fits(name)
+
+
+def test_alarm_day_names_fit():
+    for name in alarms.DAY_NAMES:
+        check_fits(name)
+
+
+def test_a_long_word_is_clipped():
+    LCD.display_text("Wednesday")
+    expected = sum(glyph_pixels(letter) for letter in "Wednesday")
+    assert lit_pixels() < expected
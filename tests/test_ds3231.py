@@ -0,0 +1,67 @@
+#=============================================================
+# DS3231.read_datetime() against a fake I2C register file.
+#=============================================================
+
+import emulator
+
+emulator.install()
+
+import ds3231
+
+
+# The DS3231's registers. Reads and writes wrap around at the end, as the chip's do
+class FakeI2C:
+
+    def __init__(self):
+        self.regs = bytearray(0x13)
+        self.transfers = 0
+
+    def readfrom_mem(self, addr, reg, nbytes):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, reg, buf)
+        return bytes(buf)
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        assert addr == 0x68
+        self.transfers += 1
+        for i in range(len(buf)):
+            buf[i] = self.regs[(reg + i) % len(self.regs)]
+
+    def writeto_mem(self, addr, reg, buf):
+        assert addr == 0x68
+        self.transfers += 1
+        for i, b in enumerate(buf):
+            self.regs[(reg + i) % len(self.regs)] = b
+
+
+def make_rtc(time_regs):
+    rtc = ds3231.DS3231()
+    rtc.i2c = FakeI2C()
+    rtc.i2c.regs[0:7] = bytes(time_regs)
+    return rtc
+
+
+def test_read_datetime_decodes_all_registers_in_one_transfer():
+    # 23:59:58 on Sunday (7) 31/12/2099, in BCD
+    rtc = make_rtc((0x58, 0x59, 0x23, 0x07, 0x31, 0x12, 0x99))
+    assert rtc.read_datetime() == (2099, 12, 31, 7, 23, 59, 58)
+    assert rtc.i2c.transfers == 1
+
+
+def test_read_datetime_ignores_flag_bits():
+    # 24 hour mode bit clear, century bit set in the month register
+    rtc = make_rtc((0x05, 0x04, 0x03, 0x02, 0x01, 0x81, 0x26))
+    assert rtc.read_datetime() == (2026, 1, 1, 2, 3, 4, 5)
+
+
+def test_read_time_uses_the_same_burst():
+    rtc = make_rtc((0x30, 0x15, 0x09, 0x01, 0x18, 0x10, 0x26))
+    assert rtc.Read_Time() == (9, 15, 30)
+    assert rtc.i2c.transfers == 1
+
+
+def test_set_time_writes_bcd():
+    rtc = make_rtc(bytes(7))
+    rtc.Set_Time(21, 47, 9)
+    assert rtc.i2c.regs[0:3] == bytes((0x09, 0x47, 0x21))
+    assert rtc.read_datetime()[4:] == (21, 47, 9)
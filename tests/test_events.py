@@ -0,0 +1,71 @@
+#=============================================================
+# The event queue, and the wakeups counted while waiting on it.
+# Ticks are posted from another thread, as the DS3231's 1Hz
+# interrupt would post them.
+#=============================================================
+
+import threading
+
+import emulator
+
+emulator.install()
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+import events
+
+
+def post_later(seconds, event):
+    timer = threading.Timer(seconds, events.post, (event,))
+    timer.start()
+    return timer
+
+
+def test_queue_returns_events_in_order():
+    events.clear()
+    for event in (events.TICK, events.MODE, events.LEFT | events.REPEAT):
+        events.post(event)
+
+    assert events.pending()
+    assert events.get() == events.TICK
+    assert events.get() == events.MODE
+    assert events.button(events.get()) == events.LEFT
+    assert events.get() is None
+
+
+def test_full_queue_drops_events():
+    events.clear()
+    for i in range(events.QUEUE_SIZE + 4):
+        events.post(events.TICK)
+
+    count = 0
+    while events.get() is not None:
+        count += 1
+    assert count == events.QUEUE_SIZE - 1
+
+
+def test_wait_async_counts_wakeups():
+    events.clear()
+    events.flag.clear()
+    before = events.wakeups
+
+    async def wait_for_tick_then_time_out():
+        timer = post_later(0.05, events.TICK)
+        event = await events.wait_async()
+        timer.join()
+        return event, await events.wait_async(30)
+
+    assert asyncio.run(wait_for_tick_then_time_out()) == (events.TICK, None)
+    assert events.wakeups - before == 2
+
+
+def test_waiting_event_returns_without_waking():
+    events.clear()
+    events.post(events.TICK)
+    before = events.wakeups
+
+    assert asyncio.run(events.wait_async(30)) == events.TICK
+    assert events.wakeups == before
@@ -0,0 +1,42 @@
+#=============================================================
+# The Nixie image cache only keeps images when it has room for
+# at least two, and throws away the least recently used first.
+#=============================================================
+
+import emulator
+
+emulator.install()
+
+from display import GlyphCache
+
+IMAGE = bytes(64800)
+
+
+def test_budget_of_one_image_caches_nothing():
+    cache = GlyphCache(64800)
+    cache.put(1, IMAGE)
+    assert cache.get(1) is None
+    assert cache.used == 0
+
+
+def test_least_recently_used_image_is_evicted():
+    cache = GlyphCache(2 * 64800)
+    cache.put(1, IMAGE)
+    cache.put(2, IMAGE)
+    assert cache.get(1) is not None
+    cache.put(3, IMAGE)
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+    assert cache.used == 2 * 64800
+
+
+def test_put_copies_unless_owned():
+    data = bytearray(b"abcd")
+    cache = GlyphCache(100)
+    cache.put("copy", data)
+    cache.put("owned", data, True)
+    data[0] = 0
+    assert cache.get("copy") == b"abcd"
+    assert cache.get("owned") is data
@@ -0,0 +1,78 @@
+#=============================================================
+# The PIO backend must send the LCDs exactly what the hardware
+# SPI does. The same pictures are shown through each backend,
+# each on a fresh emulated board, and the command and data
+# bytes each ST7789 model receives are compared.
+#
+# This checks the chip select and DC pins reached by wrapping
+# out(pins, 30) round from GPIO 11, the byte order of the data,
+# and that release() deselects the LCD after each transfer.
+#=============================================================
+
+import emulator
+
+emulator.install()
+
+from emulator import board as emulated_board
+import display
+import settings
+
+
+# Records what each LCD receives, and when it is deselected after receiving
+# something. Consecutive pieces of the same kind are joined, as the two
+# backends split the data into different sized writes
+def record(board):
+    stream = []
+
+    for address, panel in enumerate(board.panels):
+
+        def receive(data, dc, panel=panel, address=address, receive=panel.receive):
+            data = bytes(data)
+            if stream and stream[-1][:2] == (address, dc):
+                stream[-1] = (address, dc, stream[-1][2] + data)
+            else:
+                stream.append((address, dc, data))
+            receive(data, dc)
+
+        def deselect(panel=panel, address=address, deselect=panel.deselect):
+            if stream and stream[-1][0] == address and stream[-1][1] != "deselect":
+                stream.append((address, "deselect", b""))
+            deselect()
+
+        panel.receive = receive
+        panel.deselect = deselect
+
+    return stream
+
+
+def show_pictures(monkeypatch, backend):
+    board = emulated_board.Board()
+    monkeypatch.setattr(emulated_board, "current", board)
+    monkeypatch.setattr(settings, "LCD_BACKEND", backend)
+    stream = record(board)
+
+    LCD = display.Display()
+    assert (LCD.pio is not None) == (backend == "pio")
+
+    for digit in (0, 3, 5):
+        LCD.select_digit(digit)
+        LCD.fill(LCD.black)
+        LCD.fill_rect(0, 0, 60, 135, LCD.rgb_to_int(0x12, 0x34, 0x56))
+        LCD.show()
+
+        LCD.fill_rect(100, 40, 21, 13, LCD.white)
+        LCD.pixel(7, 9, LCD.red)
+        LCD.show()
+        LCD.show_columns(200, 0, 40)
+
+    return stream, [bytes(panel.memory) for panel in board.panels]
+
+
+def test_pio_sends_the_same_as_spi(monkeypatch):
+    spi_stream, spi_memory = show_pictures(monkeypatch, "spi")
+    pio_stream, pio_memory = show_pictures(monkeypatch, "pio")
+
+    assert any(dc == 1 and len(data) == 240 * 135 * 2 for address, dc, data in spi_stream)
+    assert {address for address, dc, data in spi_stream} >= {0, 3, 5}
+    assert pio_stream == spi_stream
+    assert pio_memory == spi_memory
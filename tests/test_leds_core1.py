@@ -0,0 +1,103 @@
+#=============================================================
+# Soak test of the second core LED animation. The animation
+# loop runs on a real thread, like it does on the second core,
+# while this thread keeps changing the pattern through the
+# mailbox. Checks that no frames are missed, that the last
+# pattern sent is the one shown, and that the loop does not
+# allocate memory which it keeps.
+#
+# LED_SOAK_SECONDS sets how long the soak runs.
+#=============================================================
+
+import os
+import time
+import tracemalloc
+
+import emulator
+
+emulator.install()
+
+import leds
+
+SOAK_SECONDS = float(os.environ.get("LED_SOAK_SECONDS", "5"))
+RAINBOW = 11
+STATIC_PATTERN = 3
+
+
+class FakeNeoPixel:
+    """Stands in for the strip's write(), counting the frames sent to the LEDs"""
+
+    def __init__(self, strip):
+        self.strip = strip
+        self.writes = 0
+        self.last = bytes(strip.buf)
+
+    def write(self):
+        self.writes += 1
+        self.last = bytes(self.strip.buf)
+
+
+def wait_frames(n):
+    time.sleep(n * leds.FRAME_MS / 1000)
+
+
+def test_second_core_soak(monkeypatch):
+    fake = FakeNeoPixel(leds.rgb_strip)
+    monkeypatch.setattr(leds.rgb_strip, "write", fake.write)
+    leds.core1_stats[leds.FRAMES] = 0
+    leds.core1_stats[leds.LATE] = 0
+    leds.rgb_mode = RAINBOW
+
+    leds.start_core1()
+    try:
+        wait_frames(10)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        frames_before = leds.core1_stats[leds.FRAMES]
+        start = time.monotonic()
+
+        # Change the pattern every few frames, sometimes faster than the
+        # second core reads the mailbox
+        sent = 0
+        full = 0
+        while time.monotonic() - start < SOAK_SECONDS:
+            for rgbmode in (STATIC_PATTERN, RAINBOW, 0, RAINBOW):
+                if leds.send_pattern(rgbmode):
+                    sent += 1
+                else:
+                    full += 1
+            wait_frames(3)
+
+        leds.send_pattern(RAINBOW)
+        wait_frames(5)
+        elapsed = time.monotonic() - start
+        frames = leds.core1_stats[leds.FRAMES] - frames_before
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        leds.send_pattern(STATIC_PATTERN)
+        wait_frames(3)
+    finally:
+        leds.stop_core1()
+        wait_frames(3)
+
+    assert sent > 0
+    assert leds.control[leds.TAIL] == leds.control[leds.HEAD]
+
+    # The rainbow runs for about half of each pattern cycle
+    assert frames >= 0.3 * elapsed * 1000 / leds.FRAME_MS
+    assert leds.core1_stats[leds.LATE] <= max(2, frames // 20)
+
+    # Nothing allocated in the animation loop is kept
+    only_leds = [tracemalloc.Filter(True, leds.__file__)]
+    growth = sum(stat.size_diff for stat in after.filter_traces(only_leds)
+                 .compare_to(before.filter_traces(only_leds), "filename"))
+    assert growth <= 0
+
+    # The loop has stopped, showing the last pattern sent
+    writes = fake.writes
+    wait_frames(3)
+    assert fake.writes == writes
+    shown = fake.last
+    leds.draw_pattern(STATIC_PATTERN, 0)
+    assert shown == fake.last
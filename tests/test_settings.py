@@ -0,0 +1,84 @@
+#=============================================================
+# Settings are written to flash only once they have stopped
+# changing for SETTINGS_FLUSH_MS, or when the menu is left, and
+# then only the changed values are appended to settings.bin.
+#=============================================================
+
+import emulator
+
+emulator.install()
+
+import pytest
+
+import settings
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 5000
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_diff(self, ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+@pytest.fixture
+def clock(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "SETTINGS_FORMAT", "binary")
+    monkeypatch.setattr(settings, "settings", dict(settings.settings))
+    monkeypatch.setattr(settings, "current", settings.Snapshot())
+    monkeypatch.setattr(settings, "callbacks", {})
+    monkeypatch.setattr(settings, "changed", set())
+    monkeypatch.setattr(settings, "writes", 0)
+    monkeypatch.setattr(settings, "log_records", 0)
+    clock = FakeClock()
+    monkeypatch.setattr(settings, "time", clock)
+    settings.save_settings()
+    return clock
+
+
+def test_changes_are_not_written_until_idle(clock, tmp_path):
+    log = tmp_path / settings.LOG_FILE
+    saved = log.read_bytes()
+    writes = settings.writes
+
+    for i in range(50):
+        settings.save_setting("brightness", 1 + i % 10)
+        settings.save_setting("alarm_min", i)
+        clock.now += 100
+        settings.flush_if_idle()
+
+    assert log.read_bytes() == saved
+    assert settings.writes == writes
+    assert settings.current.alarm_min == 49
+
+    clock.now += settings.SETTINGS_FLUSH_MS
+    settings.flush_if_idle()
+    assert settings.writes == writes + 1
+    assert len(log.read_bytes()) == len(saved) + 2 * 3
+
+    settings.flush_if_idle()
+    assert settings.writes == writes + 1
+
+
+def test_unchanged_value_is_not_written(clock, tmp_path):
+    writes = settings.writes
+    settings.save_setting("font", settings.get_setting("font"))
+    clock.now += settings.SETTINGS_FLUSH_MS
+    settings.flush_if_idle()
+    settings.flush()
+    assert settings.writes == writes
+
+
+def test_flush_writes_the_last_values(clock, tmp_path):
+    settings.save_setting("alarm_hour", 6)
+    settings.save_setting("alarm_hour", 9)
+    settings.flush()
+
+    settings.settings["alarm_hour"] = 0
+    settings.load_settings()
+    assert settings.get_setting("alarm_hour") == 9
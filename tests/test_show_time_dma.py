@@ -0,0 +1,49 @@
+#=============================================================
+# With SPI_DMA, the time display lets the other tasks run while
+# each digit's picture is being sent, rather than waiting for
+# the DMA in a loop. The emulated DMA takes as long as the real
+# SPI would.
+#=============================================================
+
+import emulator
+
+board = emulator.install()
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+import display
+import settings
+
+
+def test_other_tasks_run_while_digits_are_sent(main, monkeypatch):
+    monkeypatch.setattr(settings, "SPI_DMA", True)
+    monkeypatch.setattr(settings, "TRANSITION", "none")
+    LCD = display.Display()
+    assert LCD.dma is not None
+    LCD.set_font(2)
+    monkeypatch.setattr(main, "LCD", LCD)
+    main.previous_digits = [None] * 6
+
+    async def show_and_count():
+        ticks = 0
+        task = asyncio.create_task(main.show_time_6_digits(12, 34, 56))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep_ms(0)
+        await task
+        return ticks
+
+    ticks = asyncio.run(show_and_count())
+    LCD.wait_sent()
+
+    # Six 64,800 byte pictures take milliseconds each to send, while the
+    # time display itself yields only once between digits
+    assert ticks > 100
+    for pos, digit in enumerate((1, 2, 3, 4, 5, 6)):
+        LCD.select_digit(pos)
+        assert LCD.panel_content[LCD.selected_digit] == ("Dots", LCD.fg_colour, digit)
+        LCD.draw_digit(digit)
+        assert bytes(board.panels[LCD.selected_digit].memory) == bytes(LCD.buffer)
@@ -0,0 +1,97 @@
+#=============================================================
+# Digit transitions. A crossfade sends only the rectangle
+# around the two digits each frame, and a transition time of 0
+# changes the digit straight away.
+#=============================================================
+
+import emulator
+
+board = emulator.install()
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+import display
+import settings
+import transitions
+
+# CASET and RASET with 4 parameter bytes each, then RAMWR
+WINDOW_BYTES = 5 + 5 + 1
+
+
+class FakeSPI:
+
+    def __init__(self, spi):
+        self.spi = spi
+        self.count = 0
+
+    def write(self, buf):
+        self.count += len(buf)
+        self.spi.write(buf)
+
+    def sent(self):
+        count = self.count
+        self.count = 0
+        return count
+
+
+LCD = display.Display()
+spi = FakeSPI(LCD.spi)
+LCD.spi = spi
+
+
+def panel():
+    return board.panels[LCD.selected_digit]
+
+
+def change_digit(old, new):
+    transitions.start_tick()
+    asyncio.run(transitions.change_digit(LCD, old, new))
+
+
+def test_crossfade_sends_the_rectangle_around_the_digits(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSITION", "crossfade")
+    monkeypatch.setattr(settings, "TRANSITION_MS", 200)
+    monkeypatch.setattr(settings, "TRANSITION_FRAMES", 4)
+    LCD.set_font(2)
+    LCD.select_digit(1)
+    LCD.display_digit(1)
+    spi.sent()
+
+    x0, y0, w0, h0 = LCD.generated_bounds(1, LCD.draw_dots)
+    x1, y1, w1, h1 = LCD.generated_bounds(7, LCD.draw_dots)
+    w = max(x0 + w0, x1 + w1) - min(x0, x1)
+    h = max(y0 + h0, y1 + h1) - min(y0, y1)
+    assert w * h < LCD.width * LCD.height
+
+    sent = []
+    frame_fn = transitions.crossfade_frame
+
+    def crossfade_frame(LCD, old, new, frame, frames):
+        frame_fn(LCD, old, new, frame, frames)
+        sent.append(spi.sent())
+        assert bytes(panel().memory) == bytes(LCD.buffer)
+
+    monkeypatch.setattr(transitions, "crossfade_frame", crossfade_frame)
+    change_digit(1, 7)
+
+    assert sent
+    assert all(count == w * h * 2 + WINDOW_BYTES for count in sent)
+    assert bytes(panel().memory) == bytes(LCD.buffer)
+    assert LCD.panel_content[LCD.selected_digit] == ("Dots", LCD.fg_colour, 7)
+
+
+def test_no_transition_time_changes_the_digit_straight_away(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSITION", "crossfade")
+    monkeypatch.setattr(settings, "TRANSITION_MS", 0)
+    LCD.set_font(2)
+    LCD.select_digit(3)
+    LCD.display_digit(4)
+    frames = transitions.frames
+
+    change_digit(4, 5)
+    assert transitions.frames == frames
+    assert LCD.panel_content[LCD.selected_digit] == ("Dots", LCD.fg_colour, 5)
+    assert bytes(panel().memory) == bytes(LCD.buffer)
@@ -0,0 +1,179 @@
+#=============================================================
+#=============================================================
+#=============================================================
+# Digit transition animations. When a digit of the time
+# changes, the new digit can crossfade from the old one, slide
+# down over it, or flicker on like a Nixie tube warming up.
+#
+# A transition lasts up to TRANSITION_MS, as up to
+# TRANSITION_FRAMES frames. The frames are timed, and any whose
+# time has already passed are skipped, so a slow transition
+# has fewer frames rather than running late.
+#
+# All the transitions for one tick share TRANSITION_BUDGET_MS,
+# so they never hold up the next tick. Once the budget is used
+# up, digits change straight away, as they do with no
+# transition. A button press or the next tick also cuts a
+# transition short.
+#=============================================================
+#=============================================================
+#=============================================================
+
+import time
+import settings
+import events
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# ST7789 commands to blank the LCD and show its picture again
+DISPOFF = 0x28
+DISPON  = 0x29
+
+EFFECTS = ("none", "crossfade", "slide", "flicker")
+
+# Whether the digit is lit, through the frames of a flicker
+FLICKER = (0, 1, 0, 0, 1, 1, 0, 1)
+
+deadline = 0         # time by which this tick's transitions must finish
+
+# Frame timing, for checking the budget is sensible
+frames = 0           # number of frames drawn
+dropped_frames = 0   # number of frames skipped as they were late, or cut short
+last_frame_us = 0    # time taken to draw and send the last frame
+max_frame_us = 0     # the longest time taken by any frame
+total_frame_us = 0
+
+
+# Starts the budget for the transitions of one tick
+def start_tick():
+    global deadline
+    deadline = time.ticks_add(time.ticks_ms(), settings.TRANSITION_BUDGET_MS)
+
+
+def stats():
+    return "Transitions: {0} frames, {1} dropped, {2}us average, {3}us max, {4}us last".format(
+        frames, dropped_frames, total_frame_us // max(frames, 1), max_frame_us, last_frame_us)
+
+
+# A Display colour scaled by level / levels. The colours are RGB565 with the
+# bytes swapped, as the frame buffer is sent to the LCDs low byte first
+def scale_colour(colour, level, levels):
+    c = ((colour & 0xFF) << 8) | (colour >> 8)
+    c = ((((c >> 11) * level // levels) << 11) |
+         ((((c >> 5) & 0x3F) * level // levels) << 5) |
+         ((c & 0x1F) * level // levels))
+    return ((c & 0xFF) << 8) | (c >> 8)
+
+
+#=============================================================
+# The frames of each transition, for frame numbers 1 to
+# frames - 1. Frame 0 is the old digit and the last is the new
+# digit, shown normally.
+#=============================================================
+
+# The old Dots or 7 segment digit fades out as the new one fades in. Each is
+# drawn with black left transparent, the brighter one last, so where they
+# overlap the brighter one shows. Everything outside the rectangle around
+# the two digits stays black, so only that rectangle is cleared and sent
+def crossfade_frame(LCD, old, new, frame, frames):
+    draw = LCD.draw_dots if LCD.font_style == "Dots" else LCD.draw_7seg
+    old_colour = scale_colour(LCD.fg_colour, frames - frame, frames)
+    new_colour = scale_colour(LCD.fg_colour, frame, frames)
+    
+    x0, y0, w0, h0 = LCD.generated_bounds(old, draw)
+    x1, y1, w1, h1 = LCD.generated_bounds(new, draw)
+    x = min(x0, x1)
+    y = min(y0, y1)
+    LCD.fill_rect(x, y, max(x0 + w0, x1 + w1) - x, max(y0 + h0, y1 + h1) - y, LCD.black)
+    if frame * 2 < frames:
+        LCD.draw_generated(new, draw, new_colour, LCD.black)
+        LCD.draw_generated(old, draw, old_colour, LCD.black)
+    else:
+        LCD.draw_generated(old, draw, old_colour, LCD.black)
+        LCD.draw_generated(new, draw, new_colour, LCD.black)
+    LCD.show()
+
+
+# The new digit, already in the frame buffer, slides down from the top of the
+# LCD over the old one. Only the part covering the old digit is sent
+def slide_frame(LCD, old, new, frame, frames):
+    w = LCD.width * frame // frames
+    if w > 0:
+        LCD.show_columns(0, LCD.width - w, w)
+
+
+# The new digit, already shown, is blanked and shown again in an uneven pattern
+def flicker_frame(LCD, old, new, frame, frames):
+    LCD.write_cmd(DISPON if FLICKER[frame * len(FLICKER) // frames] else DISPOFF)
+
+
+#=============================================================
+# Runs the frames of a transition over `duration` ms, letting
+# the other tasks run in between
+#=============================================================
+async def run(LCD, draw_frame, old, new, duration):
+    global frames, dropped_frames, last_frame_us, max_frame_us, total_frame_us
+    
+    count = settings.TRANSITION_FRAMES
+    start = time.ticks_ms()
+    frame = 1
+    
+    while frame < count:
+        t = time.ticks_us()
+        draw_frame(LCD, old, new, frame, count)
+        last_frame_us = time.ticks_diff(time.ticks_us(), t)
+        total_frame_us = total_frame_us + last_frame_us
+        if last_frame_us > max_frame_us:
+            max_frame_us = last_frame_us
+        frames = frames + 1
+        
+        # Finish straight away if a button has been pressed or the next tick is due
+        if events.pending():
+            dropped_frames = dropped_frames + count - 1 - frame
+            return
+            
+        # Skip any frames whose time has already passed
+        due = time.ticks_diff(time.ticks_ms(), start) * count // duration
+        if due > frame:
+            dropped_frames = dropped_frames + min(due, count) - frame - 1
+            frame = due
+        frame = frame + 1
+        
+        if frame < count:
+            await asyncio.sleep_ms(
+                time.ticks_diff(time.ticks_add(start, frame * duration // count), time.ticks_ms()))
+        
+
+#=============================================================
+# Changes the selected LCD from showing digit `old` to `new`,
+# with the transition chosen in settings.py
+#=============================================================
+async def change_digit(LCD, old, new):
+    effect = settings.TRANSITION
+    if effect not in EFFECTS:
+        effect = "none"
+    if (effect == "crossfade") and (LCD.font_style == "Nixie"):
+        effect = "slide"    # blending full colour pictures would be far too slow
+    
+    duration = min(settings.TRANSITION_MS, time.ticks_diff(deadline, time.ticks_ms()))
+    
+    if (effect == "none") or (old is None) or (old == new) or (duration <= 0) or \
+       (duration * settings.TRANSITION_FRAMES < settings.TRANSITION_MS):
+        await LCD.display_digit_async(new)
+        
+    elif effect == "crossfade":
+        await run(LCD, crossfade_frame, old, new, duration)
+        await LCD.display_digit_async(new)
+        
+    elif effect == "slide":
+        LCD.draw_digit(new)
+        await run(LCD, slide_frame, old, new, duration)
+        await LCD.show_async()
+        
+    else:
+        await LCD.display_digit_async(new)
+        await run(LCD, flicker_frame, old, new, duration)
+        LCD.write_cmd(DISPON)